@@ -0,0 +1,199 @@
+"""
+Пакетная обработка акций WB и Ozon без Streamlit.
+
+Для каждого файла акции строится таблица, к ней применяются правила из JSON (тот же формат,
+что выгружает кнопка «Скачать правила»), а результат записывается в папку out/<имя файла акции>/.
+Файлы акций обрабатываются параллельно в нескольких процессах.
+
+Правила — список для всех акций или словарь {имя файла акции без расширения: список},
+где ключ "*" задаёт правила по умолчанию.
+
+Запуск:
+    python batch.py wb --sales sales.xlsx --markup markup.xlsx --rules rules.json promo/ --out out/
+    python batch.py ozon --sales sales.xlsx --markup markup.xlsx promo1.xlsx promo2.xlsx --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from loguru import logger
+
+from common.FilterEngine import rule_from_dict
+
+# Имя выходного файла -> метод таблицы, как на страницах приложения
+OUTPUTS = {
+    "wb": {"output.xlsx": "download_excel", "reverse_output.xlsx": "download_reverse_excel"},
+    "ozon": {"output.xlsx": "download_excel"},
+}
+
+
+def load_table(marketplace, sales_xlsx, markup_xlsx, goods_exclude_xlsx):
+    if marketplace == "wb":
+        from wb.FilteredTableMerger import FilteredTableMerger
+        return FilteredTableMerger(sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+
+    from ozon.OzonTable import OzonTable
+    return OzonTable(sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+
+
+def parse_shared_inputs(marketplace, sales_xlsx, markup_xlsx):
+    """
+    Разбирает файлы продаж и наценки в ParseCache до запуска процессов.
+
+    Эти файлы общие для всех акций: без прогрева каждый процесс при пустом кэше разбирал бы
+    их заново одновременно с остальными. Разбор идёт в текущем процессе без пула, чтобы
+    к форку процессов акций у него не было лишних потоков.
+    """
+    from common.ParseCache import shared_cache
+
+    if marketplace == "wb":
+        from wb.FilteredTableMerger import shared_jobs
+    else:
+        from ozon.OzonTable import shared_jobs
+
+    cache = shared_cache()
+    for source, parse, params in shared_jobs(sales_xlsx, markup_xlsx).values():
+        cache.cached(source, parse, **params)
+
+
+def promo_files(paths):
+    """
+    Файлы акций из списка файлов и папок; один и тот же файл берётся один раз.
+
+    Исключения:
+        ValueError: У разных файлов одинаковое имя — их выгрузки и правила попали бы в одну папку.
+    """
+    files = {}
+    for path in map(Path, paths):
+        if path.is_dir():
+            found = sorted(file for file in path.glob("*.xlsx") if not file.name.startswith("~$"))
+        else:
+            found = [path]
+        for file in found:
+            files.setdefault(file.resolve(), file)
+
+    by_stem = {}
+    for file in files.values():
+        by_stem.setdefault(file.stem, []).append(str(file))
+    duplicates = [", ".join(names) for names in by_stem.values() if len(names) > 1]
+    if duplicates:
+        raise ValueError(f"одинаковые имена файлов акций: {'; '.join(duplicates)}")
+    return list(files.values())
+
+
+def load_rules(rules_path):
+    """
+    Читает и проверяет файл правил.
+
+    Возвращает:
+        dict: Правила по имени файла акции, ключ "*" — правила по умолчанию.
+    """
+    if rules_path is None:
+        return {"*": []}
+
+    rules = json.loads(Path(rules_path).read_text(encoding="utf-8"))
+    if isinstance(rules, list):
+        rules = {"*": rules}
+    if not isinstance(rules, dict):
+        raise ValueError("ожидается список правил или словарь {акция: список правил}")
+
+    for promo, promo_rules in rules.items():
+        if not isinstance(promo_rules, list):
+            raise ValueError(f"правила для '{promo}' должны быть списком")
+        for data in promo_rules:
+            rule_from_dict(data)
+    return rules
+
+
+def process_promo(marketplace, sales_xlsx, markup_xlsx, goods_exclude_xlsx, rules, out_dir):
+    """
+    Обрабатывает одну акцию и записывает выгрузки, применённые правила, лог и замеры этапов.
+
+    Возвращает:
+        dict: Имя акции, число оставшихся строк и время обработки в секундах.
+    """
+    start = time.perf_counter()
+    table = load_table(marketplace, sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+    table.replay_rules(json.dumps(rules, ensure_ascii=False))
+
+    target = Path(out_dir) / Path(goods_exclude_xlsx).stem
+    target.mkdir(parents=True, exist_ok=True)
+    for file_name, method in OUTPUTS[marketplace].items():
+        (target / file_name).write_bytes(getattr(table, method)())
+    (target / "rules.json").write_text(table.export_rules(), encoding="utf-8")
+    (target / "log.txt").write_text(table.get_logs(), encoding="utf-8")
+    (target / "events.json").write_text(table.export_events(), encoding="utf-8")
+
+    return {"promo": target.name, "rows": table.engine.count, "seconds": time.perf_counter() - start}
+
+
+def _init_worker(verbose):
+    # Акции уже обрабатываются параллельно, поэтому файлы одной акции разбираются в том же процессе
+    os.environ.setdefault("STOCKS_PARSE_WORKERS", "0")
+    # Без --verbose сообщения таблиц пишутся только в log.txt каждой акции
+    if not verbose:
+        logger.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("marketplace", choices=sorted(OUTPUTS))
+    parser.add_argument("promo", nargs="+", help="Файлы акций или папки с ними.")
+    parser.add_argument("--sales", required=True, help="Отчёт о продажах.")
+    parser.add_argument("--markup", required=True, help="Таблица наценки.")
+    parser.add_argument("--rules", help="JSON с правилами фильтрации.")
+    parser.add_argument("--out", type=Path, default=Path("batch_output"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--verbose", action="store_true", help="Печатать сообщения таблиц в консоль.")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as error:
+        parser.error(f"Не удалось прочитать правила: {error}")
+    try:
+        files = promo_files(args.promo)
+    except ValueError as error:
+        parser.error(f"Не удалось собрать файлы акций: {error}")
+    if not files:
+        parser.error("Не найдено ни одного файла акции.")
+
+    jobs = [(args.marketplace, args.sales, args.markup, str(file), rules.get(file.stem, rules.get("*", [])), args.out)
+            for file in files]
+    failed = 0
+
+    def report(job, future):
+        nonlocal failed
+        try:
+            result = future()
+        except Exception as error:
+            failed += 1
+            print(f"{Path(job[3]).name}: ошибка: {error}", file=sys.stderr)
+        else:
+            print(f"{result['promo']}: осталось {result['rows']} строк за {result['seconds']:.1f} с")
+
+    _init_worker(args.verbose)
+    if args.workers <= 1 or len(jobs) == 1:
+        for job in jobs:
+            report(job, lambda: process_promo(*job))
+    else:
+        try:
+            parse_shared_inputs(args.marketplace, args.sales, args.markup)
+        except Exception as error:
+            parser.error(f"Не удалось прочитать файлы продаж и наценки: {error}")
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.verbose,)) as executor:
+            futures = {executor.submit(process_promo, *job): job for job in jobs}
+            for future in as_completed(futures):
+                report(futures[future], future.result)
+
+    print(f"Готово: {len(jobs) - failed} из {len(jobs)}, результаты в {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Сравнение старого (apply + поиск в списке) и нового (isin по хэшу) построения колонки участия
+в OzonTable.download_excel на таблицах от 1 тыс. до 500 тыс. строк.
+
+Запуск: python -m benchmarks.bench_participation [--legacy-limit 20000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ozon.OzonTable import participation_column
+
+SIZES = [1_000, 10_000, 50_000, 100_000, 500_000]
+
+
+def legacy_participation_column(table, articles):
+    return table.apply(lambda row: "" if row["Артикул"] in articles else "Да*", axis=1)
+
+
+def make_table(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame({"Артикул": [str(100000 + i) for i in range(rows)]})
+    excluded = table["Артикул"][rng.random(rows) < 0.6]
+    return table, excluded
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--legacy-limit", type=int, default=20_000,
+                        help="Старый вариант O(n·m) запускается только до этого числа строк.")
+    args = parser.parse_args()
+
+    print(f"{'строк':>10} {'старый, с':>12} {'новый, с':>12}")
+    for rows in args.sizes:
+        table, excluded = make_table(rows)
+        new_time, new_result = measure(participation_column, table["Артикул"], excluded.unique())
+
+        legacy = "—"
+        if rows <= args.legacy_limit:
+            legacy_time, legacy_result = measure(legacy_participation_column, table, excluded.tolist())
+            assert (legacy_result.to_numpy() == new_result).all()
+            legacy = f"{legacy_time:.3f}"
+
+        print(f"{rows:>10} {legacy:>12} {new_time:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
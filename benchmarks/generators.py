@@ -0,0 +1,183 @@
+"""
+Генераторы синтетических входных файлов WB и Ozon заданного размера для бенчмарков.
+"""
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import xlsxwriter
+
+BRANDS = ["Северянка", "Лисичка", "Baltic", "Nord", "Теплый дом", "Uyut", "Snow", "Мишка"]
+CATEGORIES = ["Шапки", "Носки", "Варежки", "Шарфы", "Перчатки", "Пледы", "Тапочки"]
+PROMO_DATE = "15.10.2026"
+
+
+def _articles(rows, prefix):
+    return [f"{prefix}{i:07d}" for i in range(rows)]
+
+
+def _write_sheet(workbook, name, header, columns, startrow=0, preamble=()):
+    worksheet = workbook.add_worksheet(name)
+    for row, values in enumerate(preamble):
+        worksheet.write_row(row, 0, values)
+    worksheet.write_row(startrow, 0, header)
+    for row, values in enumerate(zip(*columns), startrow + 1):
+        worksheet.write_row(row, 0, values)
+
+
+def write_wb_inputs(directory, rows, extra_columns=150, seed=0):
+    """
+    Пишет воронку продаж (лист «Товары», заголовок во 2-й строке), наценку и товары для исключения.
+
+    Возвращает:
+        dict: Пути к файлам по ключам sales_xlsx, markup_xlsx, goods_exclude_xlsx.
+    """
+    rng = np.random.default_rng(seed)
+    articles = _articles(rows, "WB")
+    paths = {name: directory / f"wb_{name}_{rows}.xlsx" for name in ("sales", "markup", "goods_exclude")}
+
+    with xlsxwriter.Workbook(paths["goods_exclude"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Sheet1",
+                     ["Артикул поставщика", "Бренд", "Предмет", "Цена продажи", "Комиссия без скидки",
+                      "Загружаемая скидка для участия в акции"],
+                     [articles, rng.choice(BRANDS, rows).tolist(), rng.choice(CATEGORIES, rows).tolist(),
+                      rng.integers(300, 6000, rows).tolist(), rng.integers(30, 900, rows).tolist(),
+                      rng.integers(5, 60, rows).tolist()])
+
+    markup_order = rng.permutation(rows)
+    with xlsxwriter.Workbook(paths["markup"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Наценка", ["Наименование", "Оригинальный номер", "Среднезакупочная"],
+                     [[f"Товар {i}" for i in markup_order], [articles[i] for i in markup_order],
+                      rng.integers(100, 2500, rows).tolist()],
+                     startrow=1, preamble=[["Отчёт о наценке"]])
+
+    sold = rng.permutation(rows)[: rows * 3 // 4]
+    extra = [f"Показатель {i}" for i in range(extra_columns)]
+    with xlsxwriter.Workbook(paths["sales"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Товары", ["Бренд", "Артикул продавца", "Заказали, шт", *extra],
+                     [rng.choice(BRANDS, len(sold)).tolist(), [articles[i] for i in sold],
+                      rng.integers(0, 40, len(sold)).tolist(),
+                      *(rng.random(len(sold)).round(2).tolist() for _ in extra)],
+                     startrow=1, preamble=[["Воронка продаж"]])
+
+    return {f"{name}_xlsx": path for name, path in paths.items()}
+
+
+def write_ozon_inputs(directory, rows, seed=0):
+    """
+    Пишет файл акции Ozon (лист описания + лист «Товары <дата>» с блоком из двух строк над заголовком),
+    наценку и отчёт о продажах.
+
+    Возвращает:
+        dict: Пути к файлам по ключам sales_xlsx, markup_xlsx, goods_exclude_xlsx.
+    """
+    rng = np.random.default_rng(seed)
+    articles = _articles(rows, "OZ")
+    paths = {name: directory / f"ozon_{name}_{rows}.xlsx" for name in ("sales", "markup", "goods_exclude")}
+
+    participation = f"Участие товара в акции с {PROMO_DATE}"
+    with xlsxwriter.Workbook(paths["goods_exclude"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Описание", ["Описание акции"], [["Заполните колонку участия товара в акции"]])
+        worksheet = workbook.add_worksheet(f"Товары {PROMO_DATE}")
+        worksheet.write_row(0, 0, ["Акция", "Осенние скидки"])
+        worksheet.write_row(1, 0, ["Период", f"{PROMO_DATE} — 31.10.2026"])
+        worksheet.write_row(2, 0, ["Артикул", "Бренд", "Категория", "Рассчитанная цена для участия в акции, RUB",
+                                   participation])
+        worksheet.write_row(3, 0, ["Артикул продавца", "Бренд товара", "Категория товара", "Цена, руб", "Да/пусто"])
+        for row, values in enumerate(zip(articles, rng.choice(BRANDS, rows).tolist(),
+                                         rng.choice(CATEGORIES, rows).tolist(),
+                                         rng.integers(300, 6000, rows).tolist()), 4):
+            worksheet.write_row(row, 0, [*values, "Да"])
+
+    with xlsxwriter.Workbook(paths["markup"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Наценка", ["Наименование", "Оригинальный номер", "Среднезакупочная"],
+                     [[f"Товар {i}" for i in range(rows)], articles[::-1], rng.integers(100, 2500, rows).tolist()],
+                     startrow=1, preamble=[["Отчёт о наценке"]])
+
+    sold = rows * 3 // 4
+    with xlsxwriter.Workbook(paths["sales"], {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Продажи", ["Артикул", "Заказано товаров", "Общая комиссия"],
+                     [articles[:sold], rng.integers(0, 40, sold).tolist(), rng.integers(20, 900, sold).tolist()])
+
+    return {f"{name}_xlsx": path for name, path in paths.items()}
+
+
+def make_fbs_postings(count, products_per_posting=3, seed=0):
+    """
+    Ответ v3/posting/fbs/list с count отправлениями в статусе awaiting_deliver.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=6)
+    offers = _articles(max(count // 4, 1), "OZ")
+    postings = []
+
+    for i in range(count):
+        products = [{
+            "offer_id": offers[rng.integers(len(offers))],
+            "name": f"Товар {i}-{j} с длинным названием для ширины колонки",
+            "sku": int(rng.integers(10 ** 8, 10 ** 9)),
+            "quantity": int(rng.integers(1, 4)),
+            "price": f"{rng.integers(300, 6000)}.0000",
+        } for j in range(int(rng.integers(1, products_per_posting + 1)))]
+
+        postings.append({
+            "posting_number": f"{70000000 + i:08d}-{i % 9000 + 1000:04d}-1",
+            "status": "awaiting_deliver",
+            "in_process_at": (start + timedelta(seconds=30 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "shipment_date": (start + timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "products": products,
+        })
+
+    return {"result": {"postings": postings, "has_next": False}}
+
+
+def write_plata(path, postings_json, missing_share=0.1, seed=0):
+    """Пишет файл «Плата» с ценой за сборку для большинства артикулов из отправлений."""
+    rng = np.random.default_rng(seed)
+    offers = sorted({product["offer_id"] for posting in postings_json["result"]["postings"]
+                     for product in posting["products"]})
+    offers = [offer for offer in offers if rng.random() >= missing_share]
+
+    with xlsxwriter.Workbook(path, {"constant_memory": True}) as workbook:
+        _write_sheet(workbook, "Плата", ["Артикул", "Цена за сборку"],
+                     [offers, rng.integers(5, 30, len(offers)).tolist()])
+    return path
+
+
+def write_sticker_pdf(path, posting_numbers, seed=0):
+    """
+    Пишет PDF со стикерами: по странице на отправление, в перемешанном порядке.
+    На странице номер этикетки (последние 4 цифры) и под ним номер отправления.
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(posting_numbers))
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for i in order:
+        posting = posting_numbers[i]
+        label = posting.split("-")[0][-4:]
+        stream = (f"BT /F1 14 Tf 20 120 Td ({label}) Tj 0 -18 Td ({posting}) Tj ET\n"
+                  f"BT /F1 8 Tf 20 40 Td (OZON FBS {posting}) Tj ET").encode("ascii")
+        stream = zlib.compress(stream)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 164 164] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    with open(path, "wb") as pdf:
+        pdf.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(pdf.tell())
+            pdf.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = pdf.tell()
+        pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        pdf.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return path
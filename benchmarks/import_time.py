@@ -0,0 +1,98 @@
+"""
+Отчёт о времени импорта модулей приложения по данным python -X importtime.
+
+Каждый модуль импортируется в отдельном чистом процессе несколько раз, берётся минимум.
+Для модуля печатается полное время импорта и самые тяжёлые пакеты верхнего уровня,
+которые он подтягивает; модули, загружаемые при старте интерпретатора, не учитываются.
+
+Страницы Streamlit при импорте выполняют свой код и без `streamlit run` падают на session_state,
+но время их импорта к этому моменту уже записано, поэтому такая ошибка не считается.
+
+Запуск: python -m benchmarks.import_time [--modules wb.wb_page ozon_v2.OzonAPI] [--top 8] [--out imports.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+DEFAULT_MODULES = [
+    "streamlit",
+    "wb.wb_page",
+    "ozon.ozon_page",
+    "ozon_v2.ozon_page_v2",
+    "wb.FilteredTableMerger",
+    "ozon.OzonTable",
+    "ozon_v2.OzonAPI",
+]
+
+
+def parse_importtime(stderr):
+    """
+    Разбирает вывод -X importtime.
+
+    Возвращает:
+        dict: Имя модуля -> накопленное время импорта в микросекундах.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def run_importtime(code):
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                               capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+    return completed, parse_importtime(completed.stderr)
+
+
+def measure_module(module, repeat):
+    best = {}
+    for _ in range(repeat):
+        completed, times = run_importtime(f"import {module}")
+        if module not in times:
+            raise RuntimeError(f"Не удалось импортировать {module}:\n{completed.stderr[-2000:]}")
+        for name, cumulative in times.items():
+            best[name] = min(best.get(name, cumulative), cumulative)
+    return best
+
+
+def heaviest_packages(times, module, top, startup):
+    # Пакет верхнего уровня учитывается по строке его собственного импорта
+    own_root = module.split(".")[0]
+    packages = {name: cumulative for name, cumulative in times.items()
+                if "." not in name and name != own_root and name not in startup}
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="Число запусков на модуль, берётся минимум.")
+    parser.add_argument("--top", type=int, default=8, help="Сколько тяжёлых пакетов показывать.")
+    parser.add_argument("--out", type=Path, help="Записать результаты в JSON.")
+    args = parser.parse_args()
+
+    startup = set(run_importtime("pass")[1])
+
+    report = []
+    for module in args.modules:
+        times = measure_module(module, args.repeat)
+        packages = heaviest_packages(times, module, args.top, startup)
+        report.append({"module": module, "total_us": times[module],
+                       "packages": [{"name": name, "cumulative_us": cumulative} for name, cumulative in packages]})
+
+        print(f"{module:<30} {times[module] / 1000:10.1f} мс")
+        for name, cumulative in packages:
+            print(f"    {name:<26} {cumulative / 1000:10.1f} мс")
+
+    if args.out:
+        args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Результаты записаны в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
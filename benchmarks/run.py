@@ -0,0 +1,167 @@
+"""
+Бенчмарк этапов обработки WB и Ozon на синтетических файлах.
+
+Для каждого размера генерирует входные файлы, замеряет время этапов (первый проход)
+и пиковую память через tracemalloc (второй проход, чтобы не искажать время) и пишет всё в JSON.
+
+Файлы по умолчанию разбираются в этом же процессе (--parse-workers 0), как до появления пула разбора,
+чтобы время было сравнимо с прежними запусками. Проход с tracemalloc всегда разбирает файлы здесь же:
+память процессов пула tracemalloc не видит.
+
+Запуск: python -m benchmarks.run --sizes 1000 100000 1000000 --out bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import generators
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def wb_stages(inputs, clear_cache):
+    from wb.FilteredTableMerger import FilteredTableMerger
+
+    state = {}
+
+    def load():
+        clear_cache()
+        state["table"] = FilteredTableMerger(**inputs)
+
+    yield "FilteredTableMerger.__init__", load
+    yield "FilteredTableMerger.remove_by_percentage_order_limit", lambda: state["table"].remove_by_percentage_order_limit(30, 10)
+    yield "FilteredTableMerger.remove_by_brand", lambda: state["table"].remove_by_brand(10, state["table"].get_brands()[0])
+    yield "FilteredTableMerger.remove_by_category", lambda: state["table"].remove_by_category(10, state["table"].get_items()[0])
+    yield "FilteredTableMerger.remove_by_article", lambda: state["table"].remove_by_article(state["table"].get_article()[0])
+    yield "FilteredTableMerger.download_excel", lambda: state["table"].download_excel()
+    yield "FilteredTableMerger.download_reverse_excel", lambda: state["table"].download_reverse_excel()
+
+
+def ozon_stages(inputs, clear_cache):
+    from ozon.OzonTable import OzonTable
+
+    state = {}
+
+    def load():
+        clear_cache()
+        state["table"] = OzonTable(**inputs)
+
+    yield "OzonTable.__init__", load
+    yield "OzonTable.remove_by_percentage_order_limit", lambda: state["table"].remove_by_percentage_order_limit(30, 10)
+    yield "OzonTable.download_excel", lambda: state["table"].download_excel()
+
+
+def ozon_api_stages(inputs, clear_cache):
+    from ozon_v2.OzonAPI import OzonAPI
+
+    class SyntheticOzonAPI(OzonAPI):
+        def iter_postings(self, force=False):
+            return [inputs["postings"]["result"]["postings"]]
+
+    api = SyntheticOzonAPI(client_id="bench", key="bench")
+
+    def download():
+        # Разбор стикеров тоже кэшируется в ParseCache: без очистки второй проход замерил бы попадание в кэш
+        clear_cache()
+        api.download_df_pdf(inputs["plata_xlsx"], inputs["stickers_pdf"])
+
+    yield "OzonAPI.download_df_pdf", download
+
+
+def measure(stages, trace):
+    results = {}
+    for name, stage in stages:
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        stage()
+        elapsed = time.perf_counter() - start
+        if trace:
+            results[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            results[name] = elapsed
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Число строк в таблицах.")
+    parser.add_argument("--postings", type=int, default=2_000, help="Число отправлений и страниц стикеров.")
+    parser.add_argument("--extra-columns", type=int, default=150, help="Лишние колонки воронки продаж.")
+    parser.add_argument("--suites", nargs="+", default=["wb", "ozon", "ozon_api"], choices=["wb", "ozon", "ozon_api"])
+    parser.add_argument("--warm-cache", action="store_true", help="Не очищать кэш разбора перед загрузкой.")
+    parser.add_argument("--no-memory", action="store_true", help="Не делать второй проход с tracemalloc.")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Процессы разбора файлов в проходе со временем (STOCKS_PARSE_WORKERS); 0 — в этом процессе.")
+    parser.add_argument("--out", type=Path, default=Path("bench_results.json"))
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="stocks_bench_"))
+    os.environ.setdefault("STOCKS_CACHE_DIR", str(workdir / "cache"))
+    from common.ParseCache import shared_cache
+
+    clear_cache = (lambda: None) if args.warm_cache else (lambda: shared_cache().clear())
+
+    records = []
+
+    def run_suite(suite, stages, inputs, size):
+        os.environ["STOCKS_PARSE_WORKERS"] = str(args.parse_workers)
+        timings = measure(stages(inputs, clear_cache), trace=False)
+        os.environ["STOCKS_PARSE_WORKERS"] = "0"
+        peaks = {} if args.no_memory else measure(stages(inputs, clear_cache), trace=True)
+        for name, seconds in timings.items():
+            records.append({"suite": suite, "stage": name, "rows": size,
+                            "seconds": round(seconds, 6), "peak_bytes": peaks.get(name)})
+            peak = f"{peaks[name] / 2 ** 20:10.1f} МБ" if name in peaks else ""
+            print(f"{suite:>9} {size:>9} {name:<55} {seconds:10.3f} с {peak}")
+
+    for rows in args.sizes:
+        if "wb" in args.suites:
+            run_suite("wb", wb_stages, generators.write_wb_inputs(workdir, rows, args.extra_columns), rows)
+        if "ozon" in args.suites:
+            run_suite("ozon", ozon_stages, generators.write_ozon_inputs(workdir, rows), rows)
+
+    if "ozon_api" in args.suites:
+        postings = generators.make_fbs_postings(args.postings)
+        posting_numbers = [posting["posting_number"] for posting in postings["result"]["postings"]]
+        api_inputs = {
+            "postings": postings,
+            "plata_xlsx": generators.write_plata(workdir / "plata.xlsx", postings),
+            "stickers_pdf": generators.write_sticker_pdf(workdir / "stickers.pdf", posting_numbers),
+        }
+        run_suite("ozon_api", ozon_api_stages, api_inputs, args.postings)
+
+    result = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "warm_cache": args.warm_cache,
+            "parse_workers": args.parse_workers,
+        },
+        "results": records,
+    }
+    args.out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результаты записаны в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
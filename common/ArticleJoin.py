@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return value.strip().casefold() or None
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return str(value).casefold()
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return None
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    return str(value).strip().casefold() or None
+
+
+def normalize_keys(values):
+    """
+    Приводит артикулы к единому виду: обрезает пробелы, переводит в нижний регистр,
+    числа 123, 123.0 и строку " 123 " сводит к одному ключу "123". Пропуски становятся None.
+
+    Возвращает:
+        np.ndarray: Массив ключей (object).
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_integer_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(str).to_numpy(dtype=object)
+    return np.array([_normalize_value(value) for value in values.to_numpy(dtype=object)], dtype=object)
+
+
+class ArticleIndex:
+    """Хэш-индекс одной таблицы по нормализованному артикулу (первая строка на ключ)."""
+
+    def __init__(self, df, key):
+        keys = normalize_keys(df[key])
+        valid = pd.notna(keys)
+        first = valid & ~pd.Index(keys).duplicated()
+
+        self.positions = np.flatnonzero(first)
+        self.index = pd.Index(keys[first])
+        self.duplicates = int(np.count_nonzero(valid & ~first))
+
+    def lookup(self, keys):
+        found = self.index.get_indexer(keys)
+        return np.where(found >= 0, self.positions[np.maximum(found, 0)], -1)
+
+
+def join_articles(left, left_key, rights, suffixes=("_x", "_y")):
+    """
+    Левое соединение одной таблицы с несколькими по артикулу за один проход.
+
+    Параметры:
+        left (pd.DataFrame): Основная таблица, её строки сохраняются как есть.
+        left_key (str): Колонка артикула в основной таблице.
+        rights (list[tuple[pd.DataFrame, str]]): Присоединяемые таблицы и их колонки артикула.
+            Если имя колонки совпадает с left_key, она не дублируется (как on= в pd.merge).
+        suffixes (tuple): Суффиксы для совпадающих имён колонок, как в pd.merge.
+
+    Возвращает:
+        tuple: (объединённая_таблица, отчёт) — отчёт по каждой присоединённой таблице содержит
+            число несопоставленных строк, сами несопоставленные артикулы и число дублей ключа.
+    """
+    left_keys = normalize_keys(left[left_key])
+    columns = {column: left[column].to_numpy() for column in left.columns}
+    report = []
+
+    for right, right_key in rights:
+        index = ArticleIndex(right, right_key)
+        positions = index.lookup(left_keys)
+        unmatched = positions < 0
+
+        for column in right.columns:
+            if column == right_key == left_key:
+                continue
+            values = take(right[column].to_numpy(), positions, allow_fill=True)
+            if column in columns:
+                columns = {name + suffixes[0] if name == column else name: value for name, value in columns.items()}
+                column += suffixes[1]
+            columns[column] = values
+
+        report.append({
+            "key": right_key,
+            "unmatched_rows": int(np.count_nonzero(unmatched)),
+            "unmatched_keys": pd.unique(left[left_key].to_numpy()[unmatched]).tolist(),
+            "duplicate_keys": index.duplicates,
+        })
+
+    return pd.DataFrame(columns), report
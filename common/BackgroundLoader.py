@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from loguru import logger
+
+from common.ParseCache import ParseCache, shared_cache
+
+# Этапы загрузки в порядке выполнения: файлы разобраны, объединены, рассчитан Result и индексы
+STAGES = ("parsed", "merged", "computed")
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def parse_workers():
+    """Число процессов для разбора файлов (STOCKS_PARSE_WORKERS, по умолчанию 3); 0 — разбор в текущем потоке."""
+    return int(os.environ.get("STOCKS_PARSE_WORKERS", 3))
+
+
+def parse_pool():
+    """Общий пул процессов разбора, создаётся при первом промахе кэша и живёт до конца процесса."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn, а не fork: сервер Streamlit многопоточный, и форк может унести чужие блокировки
+            _parse_pool = ProcessPoolExecutor(max_workers=parse_workers(),
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+
+def _reset_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+def _parse_job(data, parser, params):
+    return shared_cache().cached(data, parser, **params)
+
+
+def parse_all(jobs):
+    """
+    Разбирает несколько файлов одновременно.
+
+    Разбор xlsx (openpyxl) держит GIL, поэтому файлы, которых нет в ParseCache, разбираются
+    в отдельных процессах: время загрузки — самый долгий файл, а не сумма всех.
+    Попадания в кэш читаются сразу в текущем потоке, пул для них не нужен.
+
+    Процессы пула запускаются через spawn и импортируют главный модуль, поэтому скрипт,
+    вызывающий загрузку, должен быть защищён `if __name__ == "__main__"`. Если пул всё же
+    не поднялся, файлы разбираются в текущем потоке.
+
+    Параметры:
+        jobs (dict[str, tuple]): Имя -> (файл, функция разбора, параметры разбора) как в ParseCache.cached.
+
+    Возвращает:
+        dict: Имя -> результат разбора.
+    """
+    cache = shared_cache()
+    results = {}
+    missing = {}
+    for name, (source, parser, params) in jobs.items():
+        data = ParseCache.read_bytes(source)
+        frames = cache.lookup(data, parser, **params)
+        if frames is None:
+            missing[name] = (data, parser, params)
+        else:
+            results[name] = frames
+
+    if len(missing) < 2 or parse_workers() < 1:
+        for name, (data, parser, params) in missing.items():
+            results[name] = cache.cached(data, parser, **params)
+    else:
+        try:
+            pool = parse_pool()
+            futures = {name: pool.submit(_parse_job, *job) for name, job in missing.items()}
+            for name, future in futures.items():
+                results[name] = future.result()
+        except BrokenProcessPool:
+            logger.warning("Пул разбора файлов недоступен, файлы разбираются последовательно")
+            _reset_parse_pool()
+            for name, (data, parser, params) in missing.items():
+                if name not in results:
+                    results[name] = cache.cached(data, parser, **params)
+
+    return {name: results[name] for name in jobs}
+
+
+class StageTimer:
+    """
+    Отметки этапов load_base: время каждого этапа с предыдущей отметки плюс вызов progress.
+
+    Вызывается как progress: timer("parsed"); замеры копятся в timings под именем этапа.
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress or (lambda stage: None)
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def __call__(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = now - self._last
+        self._last = now
+        self.progress(stage)
+
+
+class BackgroundLoader:
+    """
+    Строит базу таблицы в фоновом потоке, не блокируя скрипт страницы.
+
+    Функция загрузки вызывается как load(*sources, progress=...) и сообщает о пройденных
+    этапах из STAGES; страница опрашивает stage/done и забирает result, когда загрузка закончена.
+    Ошибка загрузки сохраняется в error, а не выбрасывается в фоновом потоке.
+    """
+
+    def __init__(self, load, *sources):
+        self.stage = None
+        self.result = None
+        self.error = None
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(load, sources), daemon=True,
+                                        name=f"loader-{getattr(load, '__module__', 'table')}")
+        self._thread.start()
+
+    def _run(self, load, sources):
+        try:
+            self.result = load(*sources, progress=self._advance)
+        except Exception as error:
+            logger.exception("Не удалось загрузить файлы")
+            self.error = error
+        finally:
+            self._finished.set()
+
+    def _advance(self, stage):
+        self.stage = stage
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def progress(self):
+        """Доля пройденных этапов от 0 до 1."""
+        return (STAGES.index(self.stage) + 1) / len(STAGES) if self.stage else 0.0
+
+    def wait(self, timeout=None):
+        """Ждёт окончания загрузки; возвращает базу или выбрасывает ошибку загрузки."""
+        if not self._finished.wait(timeout):
+            raise TimeoutError("Загрузка ещё не закончена")
+        if self.error is not None:
+            raise self.error
+        return self.result
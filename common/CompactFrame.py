@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+def downcast_lossless(values):
+    """
+    Сжимает числовую колонку до float32/int32, только если все значения сохраняются точно.
+
+    Возвращает:
+        pd.Series: Сжатая колонка или исходная, если без потерь сжать нельзя.
+    """
+    kind = values.dtype.kind
+    if kind == "f" and values.dtype.itemsize > 4:
+        compact = values.astype(np.float32)
+        if np.array_equal(compact.to_numpy(dtype=np.float64), values.to_numpy(), equal_nan=True):
+            return compact
+    elif kind in "iu" and values.dtype.itemsize > 4 and len(values):
+        info = np.iinfo(np.int32)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(np.int32)
+    return values
+
+
+def compact_frame(df, columns, categorical=()):
+    """
+    Оставляет из таблицы только нужные колонки в компактных типах.
+
+    Колонки из categorical хранятся как category, числовые сжимаются без потерь,
+    остальные колонки таблицы отбрасываются.
+
+    Параметры:
+        df (pd.DataFrame): Исходная таблица после объединения.
+        columns (list): Колонки, которые нужны для фильтров, расчёта и выгрузки; отсутствующие пропускаются.
+        categorical (Iterable[str]): Колонки с повторяющимися значениями (бренд, категория, артикул).
+
+    Возвращает:
+        pd.DataFrame: Новая таблица с тем же индексом.
+    """
+    categorical = set(categorical)
+    data = {}
+    for column in dict.fromkeys(columns):
+        if column not in df.columns:
+            continue
+        values = df[column]
+        data[column] = values.astype("category") if column in categorical else downcast_lossless(values)
+    return pd.DataFrame(data, index=df.index)
@@ -0,0 +1,80 @@
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+from loguru import logger
+
+# Сколько последних событий хранит журнал одной таблицы
+EVENT_LOG_SIZE = int(os.environ.get("STOCKS_EVENT_LOG_SIZE", 500))
+
+
+class EventLog:
+    """
+    Журнал одной таблицы: сообщения для боковой панели и замеры этапов.
+
+    Раньше каждая таблица добавляла свой StringIO в глобальный logger loguru и не удаляла его,
+    так что каждая строка писалась во все когда-либо созданные журналы сервера. Теперь у таблицы
+    своё кольцо из последних maxlen событий, а в loguru сообщения только дублируются для консоли.
+
+    Событие — словарь с полями time, kind ("info", "warning" или "timing") и message
+    либо stage, name, seconds и дополнительными полями замера.
+    """
+
+    def __init__(self, maxlen=None):
+        self.events = deque(maxlen=maxlen or EVENT_LOG_SIZE)
+        self.dropped = 0
+
+    def _append(self, event):
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+
+    def info(self, message):
+        logger.info(message)
+        self._append({"time": time.time(), "kind": "info", "message": message})
+
+    def warning(self, message):
+        logger.warning(message)
+        self._append({"time": time.time(), "kind": "warning", "message": message})
+
+    def timing(self, stage, name, seconds, **details):
+        self._append({"time": time.time(), "kind": "timing", "stage": stage, "name": name,
+                      "seconds": seconds, **details})
+
+    @contextmanager
+    def timed(self, stage, name, **details):
+        """
+        Замеряет блок кода и записывает событие timing.
+
+        Возвращает (в with ... as): словарь details, в который блок может дописать поля, например число строк.
+        """
+        started = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.timing(stage, name, time.perf_counter() - started, **details)
+
+    def text(self):
+        """Сообщения журнала одной строкой, как раньше в StringIO."""
+        return "".join(event["message"] + "\n" for event in self.events if event["kind"] != "timing")
+
+    def timings(self):
+        return [event for event in self.events if event["kind"] == "timing"]
+
+    def summary(self):
+        """
+        Сводка замеров по этапам.
+
+        Возвращает:
+            pd.DataFrame: stage, name, count, total, mean, max (секунды), по убыванию total.
+        """
+        timings = pd.DataFrame(self.timings(), columns=["stage", "name", "seconds"])
+        summary = timings.groupby(["stage", "name"], sort=False)["seconds"].agg(["count", "sum", "mean", "max"])
+        return summary.rename(columns={"sum": "total"}).sort_values("total", ascending=False).reset_index()
+
+    def to_json(self):
+        """Весь журнал в JSON для профилирования."""
+        return json.dumps({"dropped": self.dropped, "events": list(self.events)}, ensure_ascii=False, indent=2)
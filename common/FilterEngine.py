@@ -0,0 +1,316 @@
+from dataclasses import asdict, dataclass, fields
+
+import numpy as np
+
+from common.EventLog import EventLog
+from common.GroupIndex import GroupIndex
+from common.ThresholdIndex import ThresholdIndex
+
+# Сколько разных ограничений по заказам предпросмотр держит в кэше в пределах одного generation
+ACTIVE_PREFIX_LIMIT = 8
+
+
+@dataclass
+class PercentageOrderRule:
+    kind = "percentage_order"
+
+    percentage: float
+    order_limit: float
+
+    def select(self, engine):
+        return np.flatnonzero((engine.result > self.percentage) & (engine.orders <= self.order_limit) & ~engine.protected)
+
+
+@dataclass
+class BrandRule:
+    kind = "brand"
+
+    percentage: float
+    brand: str
+    order_limit: float
+
+    def select(self, engine):
+        return engine.select_group("brand", self.brand, self.percentage, self.order_limit)
+
+
+@dataclass
+class CategoryRule:
+    kind = "category"
+
+    percentage: float
+    category: str
+    order_limit: float
+
+    def select(self, engine):
+        return engine.select_group("category", self.category, self.percentage, self.order_limit)
+
+
+@dataclass
+class ArticleRule:
+    kind = "article"
+
+    article: str
+
+    def select(self, engine):
+        return engine.groups["article"].group_rows(engine.groups["article"].code_of(self.article))
+
+
+@dataclass
+class SaveArticleRule:
+    """Не отбрасывает строки, а защищает артикул от последующих правил."""
+    kind = "save_article"
+    protects = True
+
+    article: str
+
+    def select(self, engine):
+        return engine.groups["article"].group_rows(engine.groups["article"].code_of(self.article))
+
+
+RULES = {rule.kind: rule for rule in (PercentageOrderRule, BrandRule, CategoryRule, ArticleRule, SaveArticleRule)}
+
+
+def rule_to_dict(rule):
+    params = {key: value.item() if isinstance(value, np.generic) else value for key, value in asdict(rule).items()}
+    return {"type": rule.kind, **params}
+
+
+def rule_from_dict(data):
+    """
+    Правило из словаря, сохранённого rule_to_dict.
+
+    Исключения:
+        ValueError: Не словарь, неизвестный тип, лишние или недостающие поля, нечисловой процент или ограничение,
+            бренд, категория или артикул — не строка и не число.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Правило должно быть объектом, а не {type(data).__name__}: {data!r}.")
+    params = dict(data)
+    rule_type = params.pop("type", None)
+    if rule_type not in RULES:
+        raise ValueError(f"Неизвестный тип правила '{rule_type}'.")
+
+    rule_fields = {field.name: field for field in fields(RULES[rule_type])}
+    missing = [name for name in rule_fields if name not in params]
+    unknown = [name for name in params if name not in rule_fields]
+    if missing or unknown:
+        problems = ([f"нет полей {', '.join(missing)}"] if missing else []) + \
+                   ([f"лишние поля {', '.join(unknown)}"] if unknown else [])
+        raise ValueError(f"Правило '{rule_type}': {'; '.join(problems)}.")
+
+    for name, field in rule_fields.items():
+        value = params[name]
+        if field.type is float and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"Правило '{rule_type}': поле {name} должно быть числом, а не {value!r}.")
+        # Значение группы ищется в словаре GroupIndex, поэтому список или объект упал бы только в apply
+        if field.type is str and value is not None and not isinstance(value, (str, int, float)):
+            raise ValueError(f"Правило '{rule_type}': поле {name} должно быть строкой или числом, а не {value!r}.")
+    return RULES[rule_type](**params)
+
+
+class FilterBase:
+    """
+    Неизменяемая часть FilterEngine: таблица, Result и заказы как массивы и индексы групп.
+
+    Строится один раз на набор входных файлов. FilterEngine её только читает, поэтому одну
+    FilterBase могут разделять несколько сессий. В meta таблица хранит то, что нужно ей для выгрузки.
+    """
+
+    def __init__(self, base_df, article_col, brand_col, category_col, orders_col, result_col="Result", meta=None):
+        self.frame = base_df
+        self.article_col = article_col
+        self.brand_col = brand_col
+        self.category_col = category_col
+        self.meta = meta or {}
+
+        self.result = base_df[result_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.orders = base_df[orders_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        for array in (self.result, self.orders):
+            array.flags.writeable = False
+
+        self.groups = {
+            "brand": GroupIndex(base_df[brand_col]),
+            "category": GroupIndex(base_df[category_col]),
+            # NaN в артикуле — отдельная группа, как в isin
+            "article": GroupIndex(base_df[article_col], use_na_sentinel=False),
+        }
+        # Result по возрастанию во всей таблице и внутри брендов и категорий — для предпросмотра правил
+        self.thresholds = {
+            "all": ThresholdIndex(self.result),
+            "brand": ThresholdIndex(self.result, self.groups["brand"]),
+            "category": ThresholdIndex(self.result, self.groups["category"]),
+        }
+
+
+class FilterEngine:
+    """
+    Общая неизменяемая FilterBase плюс собственная булева маска оставшихся строк.
+
+    Каждое правило обновляет маску на месте, сама таблица копируется только при выгрузке.
+    Бренд, категория и артикул заранее разложены в GroupIndex, так что правила по группе и списки
+    вариантов для фильтров стоят O(размера группы), а не O(строк).
+    Журнал хранит каждое правило вместе с номерами затронутых строк, поэтому отмена и повтор
+    стоят O(изменённых строк), а список правил можно применить к новому файлу.
+    Счётчик generation растёт при каждом изменении маски; по нему кэшируются выгрузки.
+    Время каждого правила, отмены, повтора и построения выгрузки пишется в events.
+    Предпросмотр (preview) отвечает, сколько строк убрало бы правило, не меняя маску.
+    """
+
+    def __init__(self, shared, events=None):
+        self.shared = shared
+        self.events = events if events is not None else EventLog()
+        self.base = shared.frame
+        self.article_col = shared.article_col
+        self.brand_col = shared.brand_col
+        self.category_col = shared.category_col
+        self.result = shared.result
+        self.orders = shared.orders
+        self.groups = shared.groups
+
+        self.kept = np.ones(len(self.base), dtype=bool)
+        self.protected = np.zeros(len(self.base), dtype=bool)
+        self.alive = {name: index.sizes.copy() for name, index in self.groups.items()}
+
+        self.history = []
+        self.redo_stack = []
+
+        self.generation = 0
+        self._memo = {}
+        self._active_prefix = {}
+        self._active_generation = 0
+
+    @property
+    def count(self):
+        return int(np.count_nonzero(self.kept))
+
+    def select_group(self, group, value, percentage, order_limit):
+        index = self.groups[group]
+        rows = index.group_rows(index.code_of(value))
+        check = (self.result[rows] > percentage) & (self.orders[rows] <= order_limit) & ~self.protected[rows]
+        return rows[check]
+
+    def apply(self, rule):
+        with self.events.timed("filter", rule.kind) as details:
+            rows = rule.select(self)
+            if getattr(rule, "protects", False):
+                changed = rows[~self.protected[rows]]
+            else:
+                changed = rows[self.kept[rows]]
+            changed = changed.astype(np.int32 if len(self.kept) < 2 ** 31 else np.int64)
+
+            self._set(rule, changed, applied=True)
+            self.history.append((rule, changed))
+            self.redo_stack.clear()
+            details["rows"] = len(changed)
+        return len(changed)
+
+    def undo(self):
+        if not self.history:
+            return None
+        with self.events.timed("filter", "undo") as details:
+            rule, changed = self.history.pop()
+            self._set(rule, changed, applied=False)
+            self.redo_stack.append((rule, changed))
+            details["rows"] = len(changed)
+        return rule
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        with self.events.timed("filter", "redo") as details:
+            rule, changed = self.redo_stack.pop()
+            self._set(rule, changed, applied=True)
+            self.history.append((rule, changed))
+            details["rows"] = len(changed)
+        return rule
+
+    def memo(self, name, build):
+        """Возвращает build() из кэша, пока маска не менялась."""
+        generation, value = self._memo.get(name, (None, None))
+        if generation != self.generation:
+            with self.events.timed("export", name, generation=self.generation):
+                value = build()
+            self._memo[name] = (self.generation, value)
+        return value
+
+    def preview(self, percentage, order_limit, group=None, value=None):
+        """
+        Сколько строк убрало бы правило по проценту (в группе или во всей таблице), не меняя маску.
+
+        Параметры:
+            percentage (float): Строки с Result больше этого значения убираются.
+            order_limit (float): Убираются только строки, где заказов не больше ограничения.
+            group (str | None): "brand" или "category"; None — вся таблица, как PercentageOrderRule.
+            value: Бренд или категория для group.
+
+        Возвращает:
+            int: Число строк.
+        """
+        name = group or "all"
+        code = 0 if group is None else self.groups[group].code_of(value)
+        if code < 0:
+            return 0
+        start, end = self.shared.thresholds[name].above(code, percentage)
+        prefix = self._active(name, order_limit)
+        return int(prefix[end] - prefix[start])
+
+    def preview_emptied(self, group, percentage, order_limit):
+        """Значения группы, у которых правило по проценту для всей таблицы убрало бы все оставшиеся строки."""
+        index = self.shared.thresholds["all"]
+        start, end = index.above(0, percentage)
+        rows = index.rows[start:end]
+        rows = rows[self.kept[rows] & ~self.protected[rows] & (self.orders[rows] <= order_limit)]
+        counts = self.groups[group].counts(rows)
+        return self.groups[group].uniques[(counts > 0) & (counts == self.alive[group])]
+
+    def _active(self, name, order_limit):
+        # Накопленное число активных строк в порядке ThresholdIndex; пересчитывается раз на generation и ограничение
+        if self._active_generation != self.generation:
+            self._active_prefix.clear()
+            self._active_generation = self.generation
+
+        prefix = self._active_prefix.get((name, order_limit))
+        if prefix is None:
+            rows = self.shared.thresholds[name].rows
+            active = self.kept[rows] & ~self.protected[rows] & (self.orders[rows] <= order_limit)
+            prefix = np.concatenate(([0], np.cumsum(active)))
+            if len(self._active_prefix) >= ACTIVE_PREFIX_LIMIT:
+                self._active_prefix.pop(next(iter(self._active_prefix)))
+            self._active_prefix[(name, order_limit)] = prefix
+        return prefix
+
+    def _set(self, rule, changed, applied):
+        self.generation += 1
+        if getattr(rule, "protects", False):
+            self.protected[changed] = applied
+            return
+
+        self.kept[changed] = not applied
+        for name, index in self.groups.items():
+            if applied:
+                self.alive[name] -= index.counts(changed)
+            else:
+                self.alive[name] += index.counts(changed)
+
+    def rules(self):
+        return [rule for rule, _ in self.history]
+
+    def last_rule(self, rule_type):
+        for rule, _ in reversed(self.history):
+            if isinstance(rule, rule_type):
+                return rule
+        return None
+
+    def options(self, group):
+        return self.groups[group].uniques[self.alive[group] > 0]
+
+    def frame(self, columns=None):
+        if columns is None:
+            return self.base[self.kept]
+        return self.base.loc[self.kept, [col for col in columns if col in self.base.columns]]
+
+    def reverse_frame(self, columns=None):
+        removed = self.alive["article"][self.groups["article"].codes] == 0
+        if columns is None:
+            return self.base[removed]
+        return self.base.loc[removed, [col for col in columns if col in self.base.columns]]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+
+class GroupIndex:
+    """
+    Индекс колонки по группам: целочисленные коды строк и списки номеров строк каждой группы.
+
+    Индекс неизменяемый и строится один раз при загрузке; число оставшихся строк в группах
+    ведёт FilterEngine.
+    """
+
+    def __init__(self, values, use_na_sentinel=True):
+        self.codes, self.uniques = pd.factorize(values, use_na_sentinel=use_na_sentinel)
+        # Для категориальной колонки уникальные значения приходят как Categorical
+        self.uniques = np.asarray(self.uniques, dtype=object) if isinstance(self.uniques.dtype, pd.CategoricalDtype) \
+            else self.uniques
+        self.lookup = {value: code for code, value in enumerate(self.uniques)}
+
+        valid = self.codes >= 0
+        order = np.flatnonzero(valid)[np.argsort(self.codes[valid], kind="stable")]
+        self.sizes = np.bincount(self.codes[valid], minlength=len(self.uniques))
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+        self.rows = order.astype(np.int32 if len(self.codes) < 2 ** 31 else np.int64)
+
+        for array in (self.codes, self.sizes, self.offsets, self.rows):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.uniques)
+
+    def code_of(self, value):
+        return self.lookup.get(value, -1)
+
+    def group_rows(self, code):
+        if code < 0:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def counts(self, rows):
+        codes = self.codes[rows]
+        return np.bincount(codes[codes >= 0], minlength=len(self.uniques))
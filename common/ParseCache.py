@@ -0,0 +1,214 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+# Локальные данные приложения (кэш разбора, снимок отправлений) — в папке приложения, а не в общем /tmp
+APP_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache"
+DEFAULT_CACHE_DIR = APP_CACHE_DIR / "parse"
+
+
+def private_dir(path):
+    """
+    Создаёт каталог, доступный только владельцу (0o700), и проверяет, что он принадлежит текущему пользователю.
+
+    Исключения:
+        PermissionError: Каталог уже существует и принадлежит другому пользователю.
+    """
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if hasattr(os, "getuid"):
+        info = path.stat()
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"Каталог {path} принадлежит другому пользователю")
+        if info.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
+
+
+class ParseCache:
+    """
+    Дисковый кэш разобранных таблиц, общий для всех сессий и перезапусков.
+
+    Ключ — SHA-256 содержимого файла плюс параметры чтения (лист, строка заголовка, колонки и т.д.).
+    Таблицы хранятся в parquet (с откатом на pickle для колонок смешанных типов),
+    старые записи вытесняются по LRU при превышении бюджета в байтах.
+
+    Pickle при чтении выполняет код, поэтому каталог кэша должен быть доступен только владельцу:
+    по умолчанию это .cache/parse в папке приложения с правами 0o700, а чужой каталог не принимается.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("STOCKS_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = os.environ.get("STOCKS_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_bytes)
+        self._make_dir()
+
+    @staticmethod
+    def read_bytes(source):
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        if isinstance(source, (str, os.PathLike)):
+            return Path(source).read_bytes()
+        if hasattr(source, "getvalue"):
+            return source.getvalue()
+
+        position = source.tell()
+        source.seek(0)
+        data = source.read()
+        source.seek(position)
+        return data
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def key(self, data, **params):
+        params_json = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+        params_digest = hashlib.sha256(params_json.encode("utf-8")).hexdigest()
+        return f"{self.digest(data)[:32]}-{params_digest[:16]}"
+
+    def cached(self, source, parser, parser_kwargs=None, **params):
+        """
+        Возвращает результат parser(файл, **params) из кэша или разбирает файл и кладёт результат в кэш.
+
+        Параметры:
+            source: Путь, байты или файловый объект (в т.ч. UploadedFile).
+            parser: Функция разбора, возвращающая DataFrame или словарь DataFrame.
+            parser_kwargs (dict | None): Аргументы parser, не влияющие на результат (в ключ не входят).
+            params: Параметры разбора, входят в ключ кэша.
+
+        Возвращает:
+            pd.DataFrame | dict[str, pd.DataFrame]
+        """
+        data = self.read_bytes(source)
+        path = self._path(data, parser, params)
+
+        frames = self._load(path)
+        if frames is not None:
+            logger.debug(f"Кэш: {path.name} взят с диска")
+            return frames
+
+        frames = parser(io.BytesIO(data), **params, **(parser_kwargs or {}))
+        self._store(path, frames)
+        self._evict(keep=path)
+        return frames
+
+    def lookup(self, source, parser, **params):
+        """Результат cached из кэша без разбора файла; None, если записи ещё нет."""
+        path = self._path(self.read_bytes(source), parser, params)
+        frames = self._load(path)
+        if frames is not None:
+            logger.debug(f"Кэш: {path.name} взят с диска")
+        return frames
+
+    def read_excel(self, source, **params):
+        return self.cached(source, pd.read_excel, **params)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._make_dir()
+
+    def _make_dir(self):
+        private_dir(self.cache_dir)
+
+    def _path(self, data, parser, params):
+        return self.cache_dir / self.key(data, parser=f"{parser.__module__}.{parser.__qualname__}", **params)
+
+    def _load(self, path):
+        meta_path = path / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            frames = {item["name"]: self._read_frame(path / item["file"]) for item in meta["items"]}
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            # В том числе запись, которую в этот момент вытеснил соседний процесс
+            return None
+
+        if meta["kind"] == "frame":
+            return frames[meta["items"][0]["name"]]
+        return frames
+
+    def _store(self, path, frames):
+        if isinstance(frames, pd.DataFrame):
+            kind, items = "frame", {"": frames}
+        else:
+            kind, items = "dict", frames
+
+        tmp_path = Path(tempfile.mkdtemp(prefix=path.name + ".", dir=self.cache_dir))
+        meta = {"kind": kind, "items": []}
+        for i, (name, df) in enumerate(items.items()):
+            meta["items"].append({"name": name, "file": self._write_frame(tmp_path / str(i), df)})
+        (tmp_path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Тот же файл уже положила в кэш соседняя сессия
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _write_frame(path, df):
+        try:
+            df.to_parquet(path.with_suffix(".parquet"))
+            return path.with_suffix(".parquet").name
+        except (ValueError, TypeError, NotImplementedError):
+            path.with_suffix(".parquet").unlink(missing_ok=True)
+            df.to_pickle(path.with_suffix(".pkl"))
+            return path.with_suffix(".pkl").name
+
+    @staticmethod
+    def _read_frame(path):
+        if path.suffix == ".pkl":
+            return pd.read_pickle(path)
+
+        df = pd.read_parquet(path)
+        # pyarrow возвращает пропуски в строковых колонках как None, read_excel — как NaN
+        object_columns = df.select_dtypes(object).columns
+        df[object_columns] = df[object_columns].fillna(np.nan)
+        return df
+
+    def _evict(self, keep=None):
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            meta_path = entry / "meta.json"
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                mtime = meta_path.stat().st_mtime
+            except OSError:
+                # Запись без meta.json ещё пишется, а исчезнувшую уже вытеснил другой процесс
+                continue
+            entries.append((mtime, size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logger.debug(f"Кэш: {entry.name} вытеснен")
+
+
+_shared_cache = None
+
+
+def shared_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ParseCache()
+    return _shared_cache
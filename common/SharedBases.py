@@ -0,0 +1,84 @@
+import importlib
+import os
+
+import streamlit as st
+
+from common.BackgroundLoader import BackgroundLoader
+from common.ParseCache import ParseCache
+
+# Модуль с функцией load_base для каждой страницы
+LOADERS = {
+    "wb": "wb.FilteredTableMerger",
+    "ozon": "ozon.OzonTable",
+}
+
+STAGE_TEXT = {
+    None: "Разбор файлов…",
+    "parsed": "Файлы разобраны, объединение таблиц…",
+    "merged": "Таблицы объединены, расчёт наценки…",
+    "computed": "Готово",
+}
+
+
+# Номер попытки загрузки для набора файлов; растёт только по кнопке «Повторить загрузку»
+_attempts = {}
+
+
+@st.cache_resource(max_entries=int(os.environ.get("STOCKS_SHARED_BASES", 8)), show_spinner=False)
+def _start_loader(kind, digests, attempt, _sources):
+    return BackgroundLoader(importlib.import_module(LOADERS[kind]).load_base, *_sources)
+
+
+def _digests(sources):
+    data = tuple(ParseCache.read_bytes(source) for source in sources)
+    return tuple(ParseCache.digest(item) for item in data), data
+
+
+def shared_loader(kind, *sources):
+    """
+    Запускает (или находит уже запущенную) фоновую загрузку базы таблицы по содержимому входных файлов.
+
+    Ключ — хэши файлов, поэтому сессии, загрузившие те же файлы, получают один и тот же загрузчик
+    и в итоге один и тот же объект FilterBase, а у каждой сессии остаются только своя маска и журнал правил.
+    Загрузка с ошибкой тоже остаётся в кэше: заново она запускается только для других файлов
+    или после retry_loader. Число хранимых баз ограничено переменной окружения STOCKS_SHARED_BASES (по умолчанию 8).
+
+    Параметры:
+        kind (str): "wb" или "ozon".
+        sources: Файлы в порядке аргументов load_base (продажи, наценка, акция).
+
+    Возвращает:
+        BackgroundLoader: Загрузка идёт в фоновом потоке, база — в result после done.
+    """
+    digests, data = _digests(sources)
+    return _start_loader(kind, digests, _attempts.get((kind, digests), 0), data)
+
+
+def retry_loader(kind, *sources):
+    """Следующий вызов shared_loader с этими файлами запустит загрузку заново."""
+    digests, _ = _digests(sources)
+    _attempts[(kind, digests)] = _attempts.get((kind, digests), 0) + 1
+
+
+def loading_error(kind, loader, *sources):
+    """Показывает ошибку загрузки и кнопку повторной попытки."""
+    st.error(f"Не удалось загрузить файлы: {loader.error}")
+    if st.button("Повторить загрузку", key=f"{kind}_retry_load"):
+        retry_loader(kind, *sources)
+        st.rerun()
+
+
+@st.fragment(run_every=0.5)
+def loading_progress(kind, loader, *sources):
+    """
+    Показывает этап фоновой загрузки и перезапускает страницу, когда загрузка успешно закончилась.
+
+    При ошибке страница не перезапускается: ошибка показывается здесь же, до новой загрузки файлов
+    или нажатия «Повторить загрузку».
+    """
+    if loader.error is not None:
+        loading_error(kind, loader, *sources)
+        return
+    if loader.done:
+        st.rerun()
+    st.progress(loader.progress, text=STAGE_TEXT[loader.stage])
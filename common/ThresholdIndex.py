@@ -0,0 +1,30 @@
+import numpy as np
+
+
+class ThresholdIndex:
+    """
+    Строки, отсортированные по Result внутри каждой группы GroupIndex (или по всей таблице).
+
+    Строки с Result > X — это хвост отсортированного отрезка группы, его начало находится
+    бинарным поиском. Индекс неизменяемый и строится один раз при загрузке; какие строки ещё
+    активны (не убраны, не защищены, заказов не больше ограничения), считает FilterEngine.
+    Строки с пропуском в Result или в группе не входят в индекс: правила их никогда не убирают.
+    """
+
+    def __init__(self, result, groups=None):
+        codes = groups.codes if groups is not None else np.zeros(len(result), dtype=np.intp)
+        group_count = len(groups) if groups is not None else 1
+
+        valid = np.flatnonzero(~np.isnan(result) & (codes >= 0))
+        order = valid[np.lexsort((result[valid], codes[valid]))]
+        self.rows = order.astype(np.int32 if len(result) < 2 ** 31 else np.int64)
+        self.sorted_result = result[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(codes[order], minlength=group_count))))
+
+        for array in (self.rows, self.sorted_result, self.offsets):
+            array.flags.writeable = False
+
+    def above(self, code, percentage):
+        """Границы отрезка rows со строками группы code, у которых Result > percentage."""
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return start + int(np.searchsorted(self.sorted_result[start:end], percentage, side="right")), end
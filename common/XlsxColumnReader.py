@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def _convert_cell(value):
+    # Как в pandas: целые числа, сохранённые в xlsx как float, читаются как int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _to_array(values):
+    if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+        if values and all(isinstance(v, int) for v in values):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array([np.nan if v is None else v for v in values], dtype=object)
+
+
+def iter_rows(source, sheet_name=0, header=0, usecols=None):
+    """
+    Построчно читает лист в режиме read-only openpyxl и отдаёт только нужные колонки.
+
+    Параметры:
+        source: Путь или файловый объект xlsx.
+        sheet_name (str | int): Имя или номер листа.
+        header (int): Номер строки заголовка (с нуля), как в pd.read_excel.
+        usecols (list[str] | None): Нужные колонки; отсутствующие в файле пропускаются.
+
+    Возвращает:
+        generator: Первым элементом — список имён колонок, затем кортежи значений строк.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if isinstance(sheet_name, str) else workbook.worksheets[sheet_name]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+
+        for _ in range(header):
+            next(rows, None)
+        header_row = next(rows, ())
+        names = [f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header_row)]
+
+        if usecols is None:
+            positions = list(range(len(names)))
+        else:
+            positions = [names.index(col) for col in usecols if col in names]
+        yield [names[i] for i in positions]
+
+        for row in rows:
+            values = tuple(_convert_cell(row[i]) if i < len(row) else None for i in positions)
+            if all(v is None for v in values):
+                continue
+            yield values
+    finally:
+        workbook.close()
+
+
+def read_columns(source, sheet_name=0, header=0, usecols=None):
+    """
+    Читает из листа только указанные колонки, не материализуя остальные.
+
+    Возвращает:
+        pd.DataFrame: Таблица из типизированных массивов (int64, float64 или object).
+    """
+    rows = iter_rows(source, sheet_name=sheet_name, header=header, usecols=usecols)
+    names = next(rows)
+    columns = [list(col) for col in zip(*rows)] or [[] for _ in names]
+    return pd.DataFrame({name: _to_array(values) for name, values in zip(names, columns)})
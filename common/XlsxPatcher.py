@@ -0,0 +1,302 @@
+import io
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_PATTERN = re.compile(rb'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+CELL_PATTERN = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+REF_PATTERN = re.compile(rb'\br="([A-Z]+)(\d+)"')
+ROW_NUMBER_PATTERN = re.compile(rb'\br="(\d+)"')
+STYLE_PATTERN = re.compile(rb'\bs="(\d+)"')
+SPANS_PATTERN = re.compile(rb'\sspans="[^"]*"')
+TYPE_PATTERN = re.compile(rb'\bt="(\w+)"')
+VALUE_PATTERN = re.compile(rb'<v>(.*?)</v>', re.S)
+INLINE_TEXT_PATTERN = re.compile(rb'<t\b[^>]*>(.*?)</t>', re.S)
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<IHHHHIIH")
+ZIP32_LIMIT = 0xFFFFFFFF
+
+
+def column_letter(index):
+    """Буквенное имя колонки по номеру с нуля: 0 -> A, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def sheet_path(archive, sheet_index):
+    """Имя файла листа внутри xlsx по его номеру в книге."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.find(f"{MAIN_NS}sheets")
+    relation_id = sheets[sheet_index].get(f"{REL_NS}id")
+
+    relations = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for relation in relations.iter(f"{PACKAGE_REL_NS}Relationship"):
+        if relation.get("Id") == relation_id:
+            target = relation.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    raise KeyError(relation_id)
+
+
+def shared_strings(archive, indices):
+    """Строки из sharedStrings.xml только с нужными номерами; файл читается до последнего из них."""
+    wanted = set(indices)
+    found = {}
+    if not wanted:
+        return found
+
+    with archive.open("xl/sharedStrings.xml") as stream:
+        index = 0
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag != f"{MAIN_NS}si":
+                continue
+            if index in wanted:
+                found[index] = "".join(text.text or "" for text in element.iter(f"{MAIN_NS}t"))
+                if len(found) == len(wanted):
+                    break
+            element.clear()
+            index += 1
+    return found
+
+
+def _cell_xml(ref, style, value):
+    style_attr = b' s="' + style + b'"' if style else b""
+    if value is None or value == "":
+        return b'<c r="' + ref + b'"' + style_attr + b'/>'
+    text = escape(str(value)).encode("utf-8")
+    return b'<c r="' + ref + b'"' + style_attr + b' t="inlineStr"><is><t>' + text + b'</t></is></c>'
+
+
+def _patch_row(row_number, content, letter, value):
+    """Заменяет в строке ячейку колонки letter (или вставляет её по порядку колонок), сохраняя стиль ячейки."""
+    ref = letter + str(row_number).encode()
+    cells = []
+    replaced = False
+
+    for match in CELL_PATTERN.finditer(content):
+        cell_ref = REF_PATTERN.search(match.group(1))
+        if cell_ref is None:
+            raise ValueError("Ячейка без адреса r, лист нельзя изменить на месте")
+        cell_letter = cell_ref.group(1)
+
+        if not replaced and (len(cell_letter), cell_letter) >= (len(letter), letter):
+            replaced = True
+            if cell_letter == letter:
+                style = STYLE_PATTERN.search(match.group(1))
+                cells.append(_cell_xml(ref, style.group(1) if style else b"", value))
+                continue
+            cells.append(_cell_xml(ref, b"", value))
+        cells.append(match.group(0))
+
+    if not replaced:
+        cells.append(_cell_xml(ref, b"", value))
+    return b"".join(cells)
+
+
+def _probe_row(row_number, content, probes, collected):
+    """Запоминает тип и содержимое ячеек строки, перечисленных в probes."""
+    for match in CELL_PATTERN.finditer(content):
+        cell_ref = REF_PATTERN.search(match.group(1))
+        if cell_ref and (row_number, cell_ref.group(1)) in probes:
+            cell_type = TYPE_PATTERN.search(match.group(1))
+            collected[(row_number, cell_ref.group(1))] = (cell_type.group(1) if cell_type else b"n",
+                                                          match.group(2) or b"")
+
+
+def _cell_text(cell_type, inner, strings):
+    if cell_type == b"s":
+        return strings.get(int(VALUE_PATTERN.search(inner).group(1)))
+    if cell_type == b"inlineStr":
+        return "".join(part.decode("utf-8") for part in INLINE_TEXT_PATTERN.findall(inner))
+
+    value = VALUE_PATTERN.search(inner)
+    if value is None:
+        return None
+    text = value.group(1).decode("utf-8")
+    # Как в pandas: целое число, сохранённое как float, читается как int
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+
+def patch_sheet(sheet_xml, column, values, checks=None):
+    """
+    Переписывает ячейки одной колонки листа, не разбирая остальной XML.
+
+    Параметры:
+        sheet_xml (bytes): Содержимое xl/worksheets/sheetN.xml.
+        column (int): Номер колонки с нуля.
+        values (dict[int, str]): Номер строки Excel -> новое значение ("" — пустая ячейка).
+        checks (dict[tuple[int, int], str] | None): (строка, колонка) -> ожидаемый текст ячейки.
+
+    Возвращает:
+        tuple: (новый XML, {(строка, буквы колонки): (тип, содержимое)} для ячеек из checks)
+    """
+    letter = column_letter(column).encode()
+    probes = {(row, column_letter(col).encode()) for row, col in (checks or {})}
+    collected = {}
+    pending = sorted(values)
+    position = 0
+    parts = []
+    cursor = 0
+
+    start = sheet_xml.find(b"<sheetData")
+    end = sheet_xml.rfind(b"</sheetData>")
+    if start < 0:
+        raise ValueError("В листе нет sheetData")
+
+    probe_rows = {row for row, _ in probes}
+
+    def missing_rows(before):
+        # Строки без единой ячейки в XML нет, их нужно вставить по порядку номеров
+        nonlocal position
+        rows = []
+        while position < len(pending) and (before is None or pending[position] < before):
+            row = pending[position]
+            if values[row] not in (None, ""):
+                rows.append(b'<row r="' + str(row).encode() + b'">' + _patch_row(row, b"", letter, values[row]) +
+                            b'</row>')
+            position += 1
+        return b"".join(rows)
+
+    for match in ROW_PATTERN.finditer(sheet_xml, start, end if end >= 0 else len(sheet_xml)):
+        number = ROW_NUMBER_PATTERN.search(match.group(1))
+        if number is None:
+            raise ValueError("Строка без номера r, лист нельзя изменить на месте")
+        row = int(number.group(1))
+        content = match.group(2) or b""
+        if row in probe_rows:
+            _probe_row(row, content, probes, collected)
+        # Пропущенные строки вставляются перед первой строкой XML с большим номером, даже если её не меняем
+        inserted = missing_rows(row)
+        if inserted:
+            parts.append(sheet_xml[cursor:match.start()])
+            parts.append(inserted)
+            cursor = match.start()
+        if row not in values:
+            continue
+
+        parts.append(sheet_xml[cursor:match.start()])
+        position += 1
+        # spans — необязательная подсказка о занятых колонках, после вставки ячейки она может стать неверной
+        attrs = SPANS_PATTERN.sub(b"", match.group(1))
+        parts.append(b"<row" + attrs + b">" + _patch_row(row, content, letter, values[row]) + b"</row>")
+        cursor = match.end()
+
+    if end < 0:
+        # Пустой лист <sheetData/>
+        tail = missing_rows(None)
+        if tail:
+            return sheet_xml.replace(b"<sheetData/>", b"<sheetData>" + tail + b"</sheetData>"), collected
+        return sheet_xml, collected
+
+    parts.append(sheet_xml[cursor:end])
+    parts.append(missing_rows(None))
+    parts.append(sheet_xml[end:])
+    return b"".join(parts), collected
+
+
+def _raw_members(data, archive):
+    """Члены zip вместе со сжатыми данными без распаковки."""
+    for info in archive.infolist():
+        header = LOCAL_HEADER.unpack_from(data, info.header_offset)
+        name_start = info.header_offset + LOCAL_HEADER.size
+        name = data[name_start:name_start + header[9]]
+        data_start = name_start + header[9] + header[10]
+        if header[2] & 0x1:
+            raise ValueError("Зашифрованный xlsx нельзя изменить на месте")
+        yield info, header, name, data[data_start:data_start + info.compress_size]
+
+
+def replace_member(data, member, content):
+    """
+    Собирает xlsx, в котором заменён один файл, а остальные скопированы байт в байт без пересжатия.
+
+    Возвращает:
+        bytes: Новый xlsx.
+    """
+    output = io.BytesIO()
+    central = []
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info, header, name, raw in _raw_members(data, archive):
+            version, flags, method, time, date = header[1:6]
+            crc, compress_size, file_size = info.CRC, info.compress_size, info.file_size
+            if info.filename == member:
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                raw = compressor.compress(content) + compressor.flush()
+                version, method = max(version, 20), zipfile.ZIP_DEFLATED
+                crc, compress_size, file_size = zlib.crc32(content), len(raw), len(content)
+
+            offset = output.tell()
+            if max(offset, compress_size, file_size) > ZIP32_LIMIT:
+                raise ValueError("xlsx больше 4 ГБ нельзя изменить на месте")
+            # Размеры пишутся прямо в заголовок, поэтому дескриптор данных (бит 3) не нужен
+            flags &= ~0x08
+            output.write(LOCAL_HEADER.pack(0x04034B50, version, flags, method, time, date,
+                                           crc, compress_size, file_size, len(name), 0))
+            output.write(name)
+            output.write(raw)
+            central.append(CENTRAL_HEADER.pack(0x02014B50, info.create_version | info.create_system << 8, version,
+                                               flags, method, time, date, crc, compress_size, file_size,
+                                               len(name), 0, 0, 0, info.internal_attr, info.external_attr,
+                                               offset) + name)
+
+    directory_offset = output.tell()
+    for record in central:
+        output.write(record)
+    output.write(END_RECORD.pack(0x06054B50, 0, 0, len(central), len(central),
+                                 output.tell() - directory_offset, directory_offset, 0))
+    return output.getvalue()
+
+
+def patch_column(data, sheet_index, column, values, checks=None):
+    """
+    Меняет значения одной колонки листа в исходном xlsx, сохраняя остальную книгу как есть.
+
+    Перед записью сверяет ячейки из checks (например, заголовок колонки и артикулы крайних строк),
+    чтобы не записать значения не в те строки.
+
+    Параметры:
+        data (bytes): Исходный xlsx.
+        sheet_index (int): Номер листа с нуля.
+        column (int): Номер колонки с нуля.
+        values (dict[int, str]): Номер строки Excel -> новое значение.
+        checks (dict[tuple[int, int], str] | None): (строка Excel, колонка с нуля) -> ожидаемый текст.
+
+    Возвращает:
+        bytes: Новый xlsx.
+
+    Исключения:
+        ValueError: Лист нельзя изменить на месте или проверка не прошла.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        member = sheet_path(archive, sheet_index)
+        sheet_xml, collected = patch_sheet(archive.read(member), column, values, checks)
+
+        string_indices = [int(VALUE_PATTERN.search(inner).group(1))
+                          for cell_type, inner in collected.values() if cell_type == b"s"]
+        strings = shared_strings(archive, string_indices) if string_indices else {}
+
+        for (row, col), expected in (checks or {}).items():
+            cell = collected.get((row, column_letter(col).encode()))
+            actual = _cell_text(*cell, strings) if cell else None
+            if actual != expected:
+                raise ValueError(f"Ячейка {column_letter(col)}{row}: ожидалось {expected!r}, в файле {actual!r}")
+
+    return replace_member(data, member, sheet_xml)
@@ -1,93 +1,172 @@
 import io
+import json
 
+import numpy as np
 import pandas as pd
-from loguru import logger
 
-class OzonTable:
-    def __init__(self, sales_xlsx, markup_xlsx, goods_exclude_xlsx):
-        self.required_article = []
-        self.required_limit_order = 0
+from common.ArticleJoin import join_articles
+from common.BackgroundLoader import StageTimer, parse_all
+from common.CompactFrame import compact_frame
+from common.EventLog import EventLog
+from common.FilterEngine import (FilterBase, FilterEngine, PercentageOrderRule, BrandRule, CategoryRule, ArticleRule,
+                                 SaveArticleRule, rule_from_dict, rule_to_dict)
+from common.ParseCache import ParseCache
+from common.XlsxPatcher import patch_column
+from ozon.OzonWorkbook import HEADER_ROWS, read_promo_workbook
+
+
+def participation_column(articles, excluded_articles):
+    """Колонка участия: пусто для артикулов, оставшихся в списке исключений, иначе «Да*»."""
+    return np.where(articles.isin(excluded_articles), "", "Да*")
+
+
+def shared_jobs(sales_xlsx, markup_xlsx):
+    """Задания parse_all для файлов продаж и наценки — общих для всех акций (batch разбирает их заранее)."""
+    return {
+        "markup": (markup_xlsx, pd.read_excel, {"header": 1}),
+        "sales": (sales_xlsx, pd.read_excel, {}),
+    }
+
+
+def load_base(sales_xlsx, markup_xlsx, goods_exclude_xlsx, progress=None):
+    """
+    Читает и объединяет три файла в неизменяемую базу для OzonTable.
+
+    База зависит только от содержимого файлов, поэтому её можно один раз построить и раздать
+    всем сессиям, работающим с той же акцией. Файлы разбираются одновременно (parse_all).
+
+    Параметры:
+        progress (Callable[[str], None] | None): Вызывается после каждого этапа из STAGES.
+
+    Возвращает:
+        FilterBase: Компактная таблица с индексами; в meta — листы файла акции для выгрузки,
+        исходные байты файла акции, сообщения загрузки и время этапов загрузки.
+    """
+    progress = StageTimer(progress)
+
+    parsed = parse_all({
+        "workbook": (goods_exclude_xlsx, read_promo_workbook, {}),
+        **shared_jobs(sales_xlsx, markup_xlsx),
+    })
+    progress("parsed")
 
-        self.log_stream = io.StringIO()
-        logger.add(self.log_stream, format="{message}")
+    workbook = parsed["workbook"]
+    name_sheets = workbook["sheets"]["sheet_name"].iloc[1]
+    first_sheets = workbook["description"]
+    second_header = workbook["header"]
 
-        goods_exclude_df = pd.read_excel(goods_exclude_xlsx, sheet_name=1, header=2)
-        goods_exclude_df = goods_exclude_df.drop(0)
-        goods_exclude_df["Артикул"] = goods_exclude_df['Артикул'].astype(str)
+    goods_exclude_df = workbook["body"].drop(0)
+    goods_exclude_df["Артикул"] = goods_exclude_df['Артикул'].astype(str)
 
-        self.first_sheets = pd.read_excel(goods_exclude_xlsx, sheet_name=0)
-        self.second_header = pd.read_excel(goods_exclude_xlsx, sheet_name=1, nrows=2)
-        self.second_table = goods_exclude_df
-        xls = pd.ExcelFile(goods_exclude_xlsx)
-        self.name_sheets = xls.sheet_names[1]
+    markup_df = parsed["markup"]
+    sales_df = parsed["sales"]
 
-        markup_df = pd.read_excel(markup_xlsx, header=1)
-        markup_df['Оригинальный номер'] = markup_df['Оригинальный номер'].astype(str)
+    merged_df, join_report = join_articles(goods_exclude_df, 'Артикул',
+                                           [(markup_df, 'Оригинальный номер'), (sales_df, 'Артикул')])
+    messages = [f"Не найдено по «{item['key']}»: {item['unmatched_rows']} строк.\n" for item in join_report]
+    progress("merged")
 
-        sales_df = pd.read_excel(sales_xlsx)
-        sales_df['Артикул'] = sales_df['Артикул'].astype(str)
+    column_name = f'Итоговая цена по акции с {name_sheets.split(" ")[1]}, руб'
+    if column_name in merged_df.columns:
+        messages.append(f"Бустинг \n")
+    else:
+        column_name = "Рассчитанная цена для участия в акции, RUB"
 
-        self.merged_df = pd.merge(goods_exclude_df, markup_df, left_on='Артикул',
-                                  right_on='Оригинальный номер', how='left')
-        self.merged_df = pd.merge(self.merged_df, sales_df, on='Артикул', how='left')
+    merged_df["Среднезакупочная"] = merged_df["Среднезакупочная"].replace(0, 1).fillna(1)
+    merged_df['Result'] = (merged_df[column_name] - merged_df["Общая комиссия"] - merged_df["Среднезакупочная"]) * 100 / merged_df["Среднезакупочная"]
 
-        column_name = f'Итоговая цена по акции с {self.name_sheets.split(" ")[1]}, руб'
-        if column_name in self.merged_df.columns:
-            logger.info(f"Бустинг \n")
-        else:
-            column_name = "Рассчитанная цена для участия в акции, RUB"
+    # Выгрузка строится из second_table, поэтому для фильтров достаточно этих колонок
+    merged_df = compact_frame(merged_df, ['Артикул', "Бренд", "Категория", 'Заказано товаров', 'Result'],
+                              categorical=['Артикул', "Бренд", "Категория"])
 
-        self.merged_df["Среднезакупочная"] = self.merged_df["Среднезакупочная"].replace(0, 1).fillna(1)
-        self.merged_df['Result'] = (self.merged_df[column_name] - self.merged_df["Общая комиссия"] - self.merged_df["Среднезакупочная"]) * 100 / self.merged_df["Среднезакупочная"]
+    base = FilterBase(merged_df, article_col='Артикул', brand_col="Бренд",
+                      category_col="Категория", orders_col='Заказано товаров',
+                      meta={"first_sheets": first_sheets, "second_header": second_header,
+                            "second_table": goods_exclude_df, "name_sheets": name_sheets,
+                            "template": ParseCache.read_bytes(goods_exclude_xlsx), "messages": messages,
+                            # Тот же словарь, что у StageTimer: этап computed допишется ниже
+                            "timings": progress.timings})
+    progress("computed")
+    return base
 
-        logger.info(f"Всего строк {self.merged_df.shape[0]}.\n")
+
+class OzonTable:
+    def __init__(self, sales_xlsx, markup_xlsx, goods_exclude_xlsx, base=None):
+        self.events = EventLog()
+
+        if base is None:
+            base = load_base(sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+        self.first_sheets = base.meta["first_sheets"]
+        self.second_header = base.meta["second_header"]
+        self.second_table = base.meta["second_table"]
+        self.name_sheets = base.meta["name_sheets"]
+        self.template = base.meta["template"]
+        for stage, seconds in base.meta["timings"].items():
+            self.events.timing("load", stage, seconds)
+        for message in base.meta["messages"]:
+            self.events.info(message)
+
+        self.engine = FilterEngine(base, events=self.events)
+
+        self.events.info(f"Всего строк {self.engine.count}.\n")
+
+    @property
+    def merged_df(self):
+        return self.engine.frame()
+
+    @property
+    def generation(self):
+        return self.engine.generation
+
+    @property
+    def required_limit_order(self):
+        rule = self.engine.last_rule(PercentageOrderRule)
+        return rule.order_limit if rule else 0
 
     def get_brands(self):
-        return self.merged_df["Бренд"].unique()
+        return self.engine.options("brand")
 
     def get_items(self):
-        return self.merged_df["Категория"].unique()
+        return self.engine.options("category")
 
     def get_article(self):
-        return self.merged_df["Артикул"].unique()
+        return self.engine.options("article")
 
     def remove_by_percentage_order_limit(self, percentage: int, order_limit:int):
-        check_article = ~self.merged_df['Артикул'].isin(self.required_article)
-        check_percentage = self.merged_df['Result'] > percentage
-        check_order_limit = self.merged_df['Заказано товаров'] <= order_limit
-        self.required_limit_order = order_limit
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_order_limit)]
-        logger.info(f"Вы убрали товары по проценту наценки после скидки и по количеству заказов. Осталось {self.merged_df.shape[0]} строк.\n")
-
-    # def remove_by_order_limit(self, order_limit: int):
-    #     check_article = ~self.merged_df['Артикул поставщика'].isin(self.required_article)
-    #     check_order_limit = self.merged_df['Заказали, шт'] < order_limit
-    #     self.merged_df = self.merged_df[~(check_article | check_order_limit)]
-    #     logger.info(f"Вы убрали товары по количеству заказов. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(PercentageOrderRule(percentage, order_limit))
+        self.events.info(f"Вы убрали товары по проценту наценки после скидки и по количеству заказов. Осталось {self.engine.count} строк.\n")
 
     def remove_by_brand(self, percentage: int, brand: str):
-        check_article = ~self.merged_df['Артикул'].isin(self.required_article)
-        check_percentage = self.merged_df['Result'] > percentage
-        check_order_limit = self.merged_df['Заказано товаров'] <= self.required_limit_order
-        check_brand = self.merged_df["Бренд"] == brand
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_brand & check_order_limit)]
-        logger.info(f"Вы убрали строки по бренду {brand}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(BrandRule(percentage, brand, self.required_limit_order))
+        self.events.info(f"Вы убрали строки по бренду {brand}. Осталось {self.engine.count} строк.\n")
 
     def remove_by_category(self, percentage: int, category: str):
-        check_article = ~self.merged_df['Артикул'].isin(self.required_article)
-        check_order_limit = self.merged_df['Заказано товаров'] <= self.required_limit_order
-        check_percentage = self.merged_df['Result'] > percentage
-        check_category = self.merged_df["Категория"] == category
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_category & check_order_limit)]
-        logger.info(f"Вы убрали строки по категории {category}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(CategoryRule(percentage, category, self.required_limit_order))
+        self.events.info(f"Вы убрали строки по категории {category}. Осталось {self.engine.count} строк.\n")
+
+    def preview_percentage_order_limit(self, percentage: int, order_limit: int):
+        """
+        Предпросмотр remove_by_percentage_order_limit без изменения таблицы.
+
+        Возвращает:
+            tuple: (число строк, которые будут убраны; бренды, которые пропадут целиком)
+        """
+        return (self.engine.preview(percentage, order_limit),
+                self.engine.preview_emptied("brand", percentage, order_limit))
+
+    def preview_brand(self, percentage: int, brand: str):
+        return self.engine.preview(percentage, self.required_limit_order, "brand", brand)
+
+    def preview_category(self, percentage: int, category: str):
+        return self.engine.preview(percentage, self.required_limit_order, "category", category)
 
     def download_excel(self):
-        articles = self.merged_df["Артикул"].tolist()
+        return self.engine.memo("excel", self._build_excel)
+
+    def _build_excel(self):
         date = self.name_sheets.split(" ")[1]
         tmp = self.second_table.copy()
-        tmp["Участие товара в акции с " + date] = tmp.apply(
-            lambda row: "" if row["Артикул"] in articles else "Да*", axis=1
-        )
+        tmp["Участие товара в акции с " + date] = participation_column(tmp["Артикул"], self.engine.options("article"))
         # tmp.drop(tmp.columns[tmp.columns.str.contains('unnamed', case=False)], axis=1, inplace=True)
         # tmp = tmp.filter(items=self.required_headers)
 
@@ -99,14 +178,73 @@ class OzonTable:
 
         return output_buffer_xlsx.getvalue()
 
+    def download_template_excel(self):
+        """
+        Файл акции в исходном оформлении: в загруженном xlsx меняется только колонка участия.
+
+        Если файл нельзя изменить на месте или проверка строк не прошла, возвращается
+        обычная выгрузка download_excel.
+        """
+        return self.engine.memo("template_excel", self._build_template_excel)
+
+    def _build_template_excel(self):
+        participation = "Участие товара в акции с " + self.name_sheets.split(" ")[1]
+        try:
+            column = self.second_table.columns.get_loc(participation)
+            articles = self.second_table["Артикул"]
+            values = participation_column(articles, self.engine.options("article"))
+
+            # Метка строки body k — это строка Excel HEADER_ROWS + 2 + k (заголовок таблицы и строка пояснений выше)
+            rows = HEADER_ROWS + 2 + articles.index.to_numpy()
+            article_column = self.second_table.columns.get_loc("Артикул")
+            checks = {(HEADER_ROWS + 1, column): participation}
+            if len(rows):
+                checks[(int(rows[0]), article_column)] = articles.iloc[0]
+                checks[(int(rows[-1]), article_column)] = articles.iloc[-1]
+
+            return patch_column(self.template, 1, column, dict(zip(rows.tolist(), values.tolist())), checks)
+        except (KeyError, ValueError) as error:
+            self.events.warning(f"Не удалось сохранить оформление файла акции ({error}), файл собран заново.\n")
+            return self.download_excel()
+
     def get_logs(self):
-        return self.log_stream.getvalue()
+        return self.events.text()
+
+    def export_events(self):
+        return self.events.to_json()
 
     def save_article(self, article: str):
-        self.required_article.append(article.strip())
-        logger.info(f"Вы убрали из акции артикул {article}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(SaveArticleRule(article.strip()))
+        self.events.info(f"Вы убрали из акции артикул {article}. Осталось {self.engine.count} строк.\n")
 
     def remove_by_article(self, article: str):
-        self.merged_df = self.merged_df[self.merged_df["Артикул"] != article]
-        logger.info(f"Вы добавили в акцию артикул {article}. Осталось {self.merged_df.shape[0]} строк.\n")
-
+        self.engine.apply(ArticleRule(article))
+        self.events.info(f"Вы добавили в акцию артикул {article}. Осталось {self.engine.count} строк.\n")
+
+    def undo(self):
+        rule = self.engine.undo()
+        if rule is not None:
+            self.events.info(f"Отменено правило {rule_to_dict(rule)}. Осталось {self.engine.count} строк.\n")
+
+    def redo(self):
+        rule = self.engine.redo()
+        if rule is not None:
+            self.events.info(f"Повторено правило {rule_to_dict(rule)}. Осталось {self.engine.count} строк.\n")
+
+    def export_rules(self):
+        return json.dumps([rule_to_dict(rule) for rule in self.engine.rules()], ensure_ascii=False, indent=2)
+
+    def replay_rules(self, rules_json):
+        # Сначала разбираются все правила, чтобы ошибка в файле не оставила часть из них применённой
+        try:
+            data = json.loads(rules_json)
+            if not isinstance(data, list):
+                raise ValueError("ожидается список правил")
+            rules = [rule_from_dict(item) for item in data]
+        except ValueError as error:
+            self.events.warning(f"Правила не применены: {error}\n")
+            return
+
+        for rule in rules:
+            self.engine.apply(rule)
+        self.events.info(f"Применены сохранённые правила. Осталось {self.engine.count} строк.\n")
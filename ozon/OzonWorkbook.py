@@ -0,0 +1,28 @@
+import pandas as pd
+
+# Строки второго листа над таблицей товаров: заголовок и две строки пояснений
+HEADER_ROWS = 2
+
+
+def read_promo_workbook(source):
+    """
+    Читает файл акции Ozon, открывая книгу один раз.
+
+    Раньше книга открывалась четыре раза (лист описания, шапка второго листа, таблица товаров
+    и ExcelFile ради названия листа), и каждый раз заново распаковывались zip и общие строки.
+    Теперь все части берутся из одного pd.ExcelFile, а шапка читается только до своих строк.
+
+    Параметры:
+        source: Путь или файловый объект с файлом акции.
+
+    Возвращает:
+        dict[str, pd.DataFrame]: sheets — названия листов (колонка sheet_name), description — первый лист,
+        header — шапка второго листа, body — таблица товаров второго листа (заголовок в третьей строке).
+    """
+    with pd.ExcelFile(source) as workbook:
+        return {
+            "sheets": pd.DataFrame({"sheet_name": workbook.sheet_names}),
+            "description": workbook.parse(0),
+            "header": workbook.parse(1, nrows=HEADER_ROWS),
+            "body": workbook.parse(1, header=HEADER_ROWS),
+        }
@@ -1,20 +1,41 @@
-import requests
-import json
-from datetime import datetime, timedelta, timezone
+import numpy as np
 import pandas as pd
-import re
-from pypdf import PdfReader, PdfWriter
+from pandas.api.extensions import take
 import io
 
+from ozon_v2.PickListWriter import write_pick_list
+from ozon_v2.PostingFetcher import PostingFetcher
+from ozon_v2.PostingStore import PostingStore
+from ozon_v2.StickerIndex import StickerIndex
+
+
+def factorize_stripped(values, sort=False):
+    """
+    Кодирует значения как строки без пробелов по краям.
+
+    Строки приводятся и обрезаются только для уникальных значений, а не для каждой строки таблицы.
+
+    Возвращает:
+        tuple: (коды, уникальные строки)
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    stripped_codes, stripped = pd.factorize(pd.Index(uniques, dtype=object).astype(str).str.strip(), sort=sort)
+    return stripped_codes[codes], np.asarray(stripped, dtype=object)
+
+
 class OzonAPI:
 
-    def __init__(self, client_id, key):
-        self.base_url = "https://api-seller.ozon.ru/"
+    def __init__(self, client_id, key, sticker_workers=None, base_url="https://api-seller.ozon.ru/"):
+        self.base_url = base_url
         self.client_id = client_id
         self.key = key
+        self.sticker_workers = sticker_workers
+        self.fetcher = PostingFetcher(self.base_url, self.client_id, self.key)
+        self.store = PostingStore(self.fetcher, self.client_id, {"delivery_method_id": ["1020000152188000"]},
+                                  status="awaiting_deliver")
 
-    def download_df_pdf(self, plata_xlsx, stickers_pdf):
-        df = self.create_ozon_dataframe(self.getListFromAPI())
+    def download_df_pdf(self, plata_xlsx, stickers_pdf, refresh=False):
+        df = self.create_ozon_dataframe(self.iter_postings(force=refresh))
         _, sort_df = self.count_and_sort_by_articles(df)
 
         plata_df = pd.read_excel(plata_xlsx)
@@ -22,58 +43,26 @@ class OzonAPI:
         merged_df = self.merge_common_articles_with_price(sort_df, plata_df)
         merged_df.drop('№', axis=1, inplace=True)
 
-        output_buffer_xlsx = io.BytesIO()
-
-        with pd.ExcelWriter(output_buffer_xlsx, engine='xlsxwriter') as writer:
-            merged_df.to_excel(writer, sheet_name='sheetName', index=False, na_rep='NaN')
-            
-            worksheet = writer.sheets['sheetName']
-            workbook = writer.book
-            
-            for column in merged_df:
-                column_length = max(merged_df[column].astype(str).map(len).max(), len(column)) if column != "Товар" else max(merged_df[column].astype(str).map(len).max(), len(column)) * 0.6
-                col_idx = merged_df.columns.get_loc(column)
-                worksheet.set_column(col_idx, col_idx, column_length)
-            
-            bold_format = workbook.add_format({'bold': True})
-            if "Этикетка" in merged_df.columns:
-                etikett_col_idx = merged_df.columns.get_loc("Этикетка")
-                worksheet.set_row(0, None, bold_format)
-                worksheet.set_column(etikett_col_idx, etikett_col_idx, None, bold_format)
-            
-            centered_format = workbook.add_format({'align': 'center', 'valign': 'vcenter'})
-            if "Количество" in merged_df.columns:
-                quantity_col_idx = merged_df.columns.get_loc("Количество")
-                worksheet.set_column(quantity_col_idx, quantity_col_idx, None, centered_format)
+        xlsx_bytes = write_pick_list(merged_df)
+
+        from pypdf import PdfReader, PdfWriter
 
         output_pdf_buffer = io.BytesIO()
 
         reader = PdfReader(stickers_pdf)
-
-        pattern=r'\d{1,4}\s\d{8,12}-\d{3,6}-\d{1,2}'
-        all_stickers = []
-
-        for page in reader.pages:
-            text = page.extract_text(extraction_mode="layout")
-            matches = re.findall(pattern, text)
-            key = matches[0].split('\n')[1]
-            temp = {
-            key : page
-            }
-
-            all_stickers.append(temp)
+        sticker_index = StickerIndex.load(stickers_pdf, workers=self.sticker_workers)
 
         order = merged_df["Поставка"].drop_duplicates().to_list()
         list_pdf = []
 
         for i in order:
-            found_values = [j[i] for j in all_stickers if i in j]
+            page_number = sticker_index.get(i)
 
-            if not found_values:
+            if page_number is None:
                 print(f"Предупреждение: Не найден стикер для заказа {i}")
                 continue
 
-            list_pdf.append(found_values[0])
+            list_pdf.append(reader.pages[page_number])
 
         output_pdf = PdfWriter()
         for i in list_pdf:
@@ -81,67 +70,56 @@ class OzonAPI:
 
         output_pdf.write(output_pdf_buffer)
 
-        return output_pdf_buffer.getvalue(), output_buffer_xlsx.getvalue()
-
-    def getListFromAPI(self):
-        current_time = datetime.now(timezone.utc)
-        week_ago = current_time - timedelta(days=7)
-
-        since = week_ago.strftime("%Y-%m-%dT%H:%M:%SZ")
-        to = current_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        url = self.base_url + "v3/posting/fbs/list"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Client-Id": self.client_id,
-            "Api-Key": self.key,
-        }
-
-        payload = {
-            "dir": "asc",
-            "filter": {
-                "delivery_method_id": ["1020000152188000"],
-                "since": since,
-                "to": to,
-                "status": "awaiting_deliver",
-            },
-            "limit": "1000",
-        }
-
-        try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as error:
-            print(f"Ошибка при выполнении запроса: {error}")
-        except json.JSONDecodeError as error:
-            print(f"Ошибка при декодировании JSON: {error}")
+        return output_pdf_buffer.getvalue(), xlsx_bytes
+
+    def getListFromAPI(self, force=False):
+        return self.store.snapshot(force=force)
+
+    def iter_postings(self, force=False):
+        self.store.sync(force=force)
+        return self.store.iter_pages()
 
     def create_ozon_dataframe(self, response_json):
-        data = []
-
-        for i, posting in enumerate(response_json.get("result", {}).get("postings", []), 1):
-
-            for product in posting.get("products", []):
-                temp = {
-                    "№": i,
-                    "Поставка": posting.get("posting_number", ""),
-                    "Товар": product.get("name", ""),
-                    "Артикул": product.get("offer_id", ""),
-                    # "SKU": product.get("sku", ""),
-                    "Количество": product.get("quantity", 0),
-                    # "Цена": product.get("price", ""),
-                    # "Статус": posting.get("status", ""),
-                    "Этикетка": posting.get("posting_number", "").split("-")[0][-4:],
-                    # "Дата отгрузки": posting.get("shipment_date", ""),
-                    # "Склад": posting.get("delivery_method", {}).get("warehouse", ""),
-                    # "Способ доставки": posting.get("delivery_method", {}).get("name", "")
-                }
-                data.append(temp)
-
-        return pd.DataFrame(data)
+        """
+        Собирает таблицу товаров из отправлений по колонкам, без словаря на каждую строку.
+
+        Параметры:
+            response_json (dict | Iterable[list[dict]]): Ответ v3/posting/fbs/list или
+                последовательность страниц отправлений (например, PostingFetcher.iter_pages),
+                которые обрабатываются по мере поступления.
+
+        Возвращает:
+            pd.DataFrame: Колонки №, Поставка, Товар, Артикул, Количество, Этикетка.
+        """
+        if isinstance(response_json, dict):
+            pages = [response_json.get("result", {}).get("postings", [])]
+        else:
+            pages = response_json
+
+        numbers, postings, names, articles, quantities = [], [], [], [], []
+        i = 0
+
+        for page in pages:
+            for posting in page:
+                i += 1
+                posting_number = posting.get("posting_number", "")
+
+                for product in posting.get("products", []):
+                    numbers.append(i)
+                    postings.append(posting_number)
+                    names.append(product.get("name", ""))
+                    articles.append(product.get("offer_id", ""))
+                    quantities.append(product.get("quantity", 0))
+
+        df = pd.DataFrame({
+            "№": numbers,
+            "Поставка": postings,
+            "Товар": names,
+            "Артикул": articles,
+            "Количество": quantities,
+        })
+        df["Этикетка"] = df["Поставка"].astype(object).str.split("-", n=1).str[0].str[-4:]
+        return df
 
     def count_and_sort_by_articles(self, df, article_col='Артикул', shipment_col='Поставка'):
         """
@@ -163,37 +141,27 @@ class OzonAPI:
         if shipment_col not in df.columns:
             raise ValueError(f"Колонка '{shipment_col}' не найдена в DataFrame.")
 
-        # Преобразование значений к строковому типу и удаление пробелов
-        df[article_col] = df[article_col].astype(str).str.strip()
-        df[shipment_col] = df[shipment_col].astype(str).str.strip()
+        # Ключи приводятся к строкам без пробелов; исходная таблица не изменяется.
+        # При sort=True коды идут в порядке сортировки строк, поэтому дальше сортируются только целые
+        article_codes, article_uniques = factorize_stripped(df[article_col], sort=True)
+        shipment_codes, shipment_uniques = factorize_stripped(df[shipment_col])
+        article_sizes = np.bincount(article_codes, minlength=len(article_uniques))
+        shipment_sizes = np.bincount(shipment_codes, minlength=len(shipment_uniques))
 
-        # Подсчет количества каждого артикула
-        article_counts = df[article_col].value_counts().reset_index()
-        article_counts.columns = [article_col, 'Количество_артикулов']
-
-        # Подсчет количества каждой поставки
-        shipment_counts = df[shipment_col].value_counts()
-
-        # Отметка уникальных поставок (только один раз встречаются)
-        unique_shipments = shipment_counts[shipment_counts == 1].index
-        df['_shipment_is_unique'] = df[shipment_col].isin(unique_shipments)
-
-        # Добавляем количество артикулов
-        df['_article_count'] = df[article_col].map(
-            article_counts.set_index(article_col)['Количество_артикулов']
-        )
+        # Сводная таблица частот в том же порядке, что и раньше
+        articles = pd.Series(article_uniques[article_codes], index=df.index)
+        article_counts = articles.value_counts().rename_axis(article_col).reset_index(name='Количество_артикулов')
 
         # Сортировка:
-        # 1. Сначала по уникальности поставки (True = уникальные вверх)
+        # 1. Сначала по уникальности поставки (уникальные вверх)
         # 2. Затем по убыванию количества артикулов
         # 3. Затем по артикулу (по возрастанию)
-        df_sorted = df.sort_values(
-            by=['_shipment_is_unique', '_article_count', article_col],
-            ascending=[False, False, True]
-        )
+        # lexsort устойчив, поэтому при равенстве сохраняется исходный порядок строк
+        order = np.lexsort((article_codes, -article_sizes[article_codes], shipment_sizes[shipment_codes] != 1))
 
-        # Удаление временных колонок
-        df_sorted = df_sorted.drop(columns=['_shipment_is_unique', '_article_count'])
+        df_sorted = df.take(order)
+        df_sorted[article_col] = article_uniques[article_codes[order]]
+        df_sorted[shipment_col] = shipment_uniques[shipment_codes[order]]
 
         return article_counts, df_sorted
 
@@ -211,20 +179,22 @@ class OzonAPI:
             pd.DataFrame: Объединённый DataFrame только с общими артикулами и ценой за сборку.
         """
 
-        # Приведение артикула к строковому виду и удаление пробелов
-        df1 = df1.copy()
-        df2 = df2.copy()
-        df1[article_col] = df1[article_col].astype(str).str.strip()
-        df2[article_col] = df2[article_col].astype(str).str.strip()
-
         # Проверка наличия нужной колонки с ценой
         if price_col not in df2.columns:
             raise ValueError(f"Колонка '{price_col}' не найдена во втором DataFrame.")
 
-        # Внутреннее объединение по артикулу
-        merged_df = pd.merge(df1, df2[[article_col, price_col]], on=article_col, how='left')
-
-        merged_df[price_col] = merged_df[price_col].fillna(default_price)
-        merged_df["Общая Цена"] = f"{merged_df[price_col].sum()}₽"
-        merged_df[price_col] = merged_df[price_col].apply(lambda x: f"{x}₽")
-        return merged_df
\ No newline at end of file
+        # Приведение артикула к строковому виду и удаление пробелов, без копирования исходных таблиц
+        article_codes, article_uniques = factorize_stripped(df1[article_col])
+        price_codes, price_uniques = factorize_stripped(df2[article_col])
+
+        # Цена берётся из первой строки с таким артикулом
+        first_rows = np.unique(price_codes, return_index=True)[1]
+        positions = pd.Index(price_uniques).get_indexer(article_uniques)[article_codes]
+        positions = np.where(positions >= 0, first_rows[positions], -1)
+        prices = pd.Series(take(df2[price_col].to_numpy(), positions, allow_fill=True)).fillna(default_price)
+
+        merged_df = df1.assign(**{article_col: article_uniques[article_codes], price_col: prices.to_numpy()})
+        merged_df.index = pd.RangeIndex(len(merged_df))
+        merged_df["Общая Цена"] = f"{prices.sum()}₽"
+        merged_df[price_col] = prices.astype(str) + "₽"
+        return merged_df
@@ -0,0 +1,79 @@
+import io
+
+import pandas as pd
+
+# Формат заголовка, который задаёт pandas в to_excel
+HEADER_FORMAT = {'bold': True, 'align': 'center', 'valign': 'top', 'top': 1, 'right': 1, 'bottom': 1, 'left': 1}
+NA_REP = 'NaN'
+
+
+def column_width(values):
+    """
+    Максимальная длина значения колонки в символах, как у values.astype(str).str.len().max().
+
+    Для строковых колонок длина считается без копирования значений, для целых — по минимуму и максимуму.
+    """
+    if len(values) == 0:
+        return 0
+    if values.dtype.kind in "iu":
+        return max(len(str(values.min())), len(str(values.max())))
+
+    lengths = values.str.len() if values.dtype == object else None
+    if lengths is None or lengths.isna().any():
+        lengths = values.astype(str).str.len()
+    return int(lengths.max())
+
+
+def write_pick_list(df, sheet_name='sheetName', bold_column="Этикетка", centered_column="Количество",
+                    narrow_column="Товар"):
+    """
+    Записывает лист подбора в XLSX построчно в режиме constant_memory.
+
+    Оформление совпадает с прежней выгрузкой через pd.ExcelWriter: заголовок pandas,
+    na_rep 'NaN', жирные первая строка и колонка bold_column, колонка centered_column по центру,
+    ширина колонок по самому длинному значению (для narrow_column — 0.6 от неё).
+
+    Параметры:
+        df (pd.DataFrame): Таблица подбора.
+        sheet_name (str): Название листа.
+
+    Возвращает:
+        bytes: Содержимое XLSX файла.
+    """
+    import xlsxwriter
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(sheet_name)
+
+    header_format = workbook.add_format(HEADER_FORMAT)
+    bold_format = workbook.add_format({'bold': True})
+    centered_format = workbook.add_format({'align': 'center', 'valign': 'vcenter'})
+
+    # В режиме constant_memory строка уходит в файл сразу после записи,
+    # поэтому форматы колонок и первой строки задаются до данных.
+    # Колонки с форматом остаются стандартной ширины, как и в прежней выгрузке.
+    for col_idx, column in enumerate(df.columns):
+        if column == bold_column:
+            worksheet.set_column(col_idx, col_idx, None, bold_format)
+        elif column == centered_column:
+            worksheet.set_column(col_idx, col_idx, None, centered_format)
+        else:
+            width = max(column_width(df[column]), len(column))
+            worksheet.set_column(col_idx, col_idx, width * 0.6 if column == narrow_column else width)
+
+    if bold_column in df.columns:
+        worksheet.set_row(0, None, bold_format)
+
+    columns = []
+    for column in df.columns:
+        values = df[column].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = NA_REP
+        columns.append(values)
+
+    worksheet.write_row(0, 0, list(df.columns), header_format)
+    for row_idx, row in enumerate(zip(*columns), start=1):
+        worksheet.write_row(row_idx, 0, row)
+
+    workbook.close()
+    return output.getvalue()
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class OzonAPIError(RuntimeError):
+    pass
+
+
+class RateLimiter:
+    """Не чаще rate запросов в секунду на все потоки вместе."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class PostingFetcher:
+    """
+    Загружает отправления FBS из v3/posting/fbs/list целиком.
+
+    Окно дат делится на интервалы, которые запрашиваются параллельно; внутри интервала
+    страницы перебираются по offset, пока has_next. Соединения переиспользуются через
+    requests.Session, ответы 429/5xx и обрывы соединения повторяются с экспоненциальной паузой.
+    """
+
+    def __init__(self, base_url, client_id, key, page_size=1000, slices=7, workers=4, rate=10,
+                 retries=5, backoff=0.5, timeout=30):
+        # requests нужен только при обращении к API, поэтому не импортируется вместе со страницей
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.url = base_url.rstrip("/") + "/v3/posting/fbs/list"
+        self.page_size = page_size
+        self.slices = slices
+        self.workers = workers
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rate)
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({"POST"}), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Client-Id": client_id,
+            "Api-Key": key,
+        })
+
+    def _post(self, payload):
+        from requests.exceptions import RequestException
+
+        self.rate_limiter.wait()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except RequestException as error:
+            raise OzonAPIError(f"Ошибка при выполнении запроса: {error}") from error
+        except ValueError as error:
+            raise OzonAPIError(f"Ошибка при декодировании JSON: {error}") from error
+
+    def iter_slice_pages(self, since, to, filters):
+        """Отдаёт списки отправлений постранично за один интервал [since, to]."""
+        offset = 0
+        while True:
+            payload = {
+                "dir": "asc",
+                "filter": {**filters, "since": since.strftime(DATE_FORMAT), "to": to.strftime(DATE_FORMAT)},
+                "limit": self.page_size,
+                "offset": offset,
+            }
+            result = self._post(payload).get("result", {})
+            yield result.get("postings", [])
+
+            if not result.get("has_next"):
+                break
+            offset += self.page_size
+
+    def fetch_slice(self, since, to, filters):
+        return [posting for page in self.iter_slice_pages(since, to, filters) for posting in page]
+
+    def time_slices(self, since, to):
+        step = (to - since) / self.slices
+        bounds = [since + step * i for i in range(self.slices)] + [to]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def iter_pages(self, since, to, filters):
+        """
+        Отдаёт отправления за окно [since, to] страницами по возрастанию даты, без дублей.
+
+        Интервалы загружаются параллельно, но отдаются по порядку, поэтому результат
+        не зависит от числа потоков. Интервал освобождается сразу после того, как отдан.
+        """
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.fetch_slice, start, end, filters)
+                       for start, end in self.time_slices(since, to)]
+            for index in range(len(futures)):
+                future, futures[index] = futures[index], None
+                page = [posting for posting in future.result() if posting.get("posting_number") not in seen]
+                seen.update(posting.get("posting_number") for posting in page)
+                del future
+                yield page
+
+    def fetch(self, since, to, filters):
+        """
+        Возвращает:
+            dict: Ответ в формате v3/posting/fbs/list со всеми отправлениями окна.
+        """
+        postings = [posting for page in self.iter_pages(since, to, filters) for posting in page]
+        return {"result": {"postings": postings, "has_next": False}}
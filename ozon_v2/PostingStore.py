@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from common.ParseCache import APP_CACHE_DIR, private_dir
+from ozon_v2.PostingFetcher import DATE_FORMAT
+
+# Снимок по умолчанию: по нему собираются лист подбора и стикеры, поэтому не в общем /tmp,
+# где файл мог бы заранее создать или подменить другой пользователь
+DEFAULT_POSTINGS_DB = APP_CACHE_DIR / "postings" / "postings.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    client_id TEXT NOT NULL,
+    posting_number TEXT NOT NULL,
+    status TEXT,
+    in_process_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (client_id, posting_number)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    client_id TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL,
+    full_synced_at TEXT NOT NULL,
+    watermark TEXT NOT NULL
+);
+"""
+
+
+class PostingStore:
+    """
+    Локальный снимок отправлений FBS в SQLite по ключу posting_number.
+
+    Пока снимок моложе ttl, API не вызывается вовсе. После этого догружаются только отправления,
+    сменившие статус после последней синхронизации (last_changed_status_date), а раз в
+    full_refresh снимок перезагружается целиком.
+    """
+
+    def __init__(self, fetcher, client_id, filters, status="awaiting_deliver", path=None,
+                 ttl=None, full_refresh=timedelta(hours=6), window=timedelta(days=7)):
+        if path is None:
+            path = os.environ.get("OZON_POSTINGS_DB")
+        if path is None:
+            path = private_dir(DEFAULT_POSTINGS_DB.parent) / DEFAULT_POSTINGS_DB.name
+        if ttl is None:
+            ttl = timedelta(seconds=int(os.environ.get("OZON_POSTINGS_TTL", 300)))
+
+        self.fetcher = fetcher
+        self.client_id = client_id
+        self.filters = filters
+        self.status = status
+        self.path = Path(path)
+        self.ttl = ttl
+        self.full_refresh = full_refresh
+        self.window = window
+        # Запас на расхождение часов и задержку индексации на стороне Ozon
+        self.overlap = timedelta(minutes=2)
+
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _sync_state(self, connection):
+        row = connection.execute("SELECT synced_at, full_synced_at, watermark FROM sync_state WHERE client_id = ?",
+                                 (self.client_id,)).fetchone()
+        return None if row is None else [datetime.fromisoformat(value) for value in row]
+
+    def sync(self, force=False):
+        """Обновляет снимок, если он устарел. Возвращает "cached", "incremental" или "full"."""
+        now = datetime.now(timezone.utc)
+        since = now - self.window
+
+        with closing(self._connect()) as connection:
+            state = self._sync_state(connection)
+
+        if state and not force and now - state[0] < self.ttl:
+            return "cached"
+
+        if state and not force and now - state[1] < self.full_refresh:
+            mode = "incremental"
+            filters = {key: value for key, value in self.filters.items() if key != "status"}
+            filters["last_changed_status_date"] = {"from": (state[2] - self.overlap).strftime(DATE_FORMAT),
+                                                   "to": now.strftime(DATE_FORMAT)}
+        else:
+            mode = "full"
+            filters = {**self.filters, "status": self.status}
+
+        with closing(self._connect()) as connection:
+            # Страницы пишутся по мере получения во временную таблицу соединения: она не блокирует
+            # основную базу, пока идут запросы к API, а в памяти одновременно только одна страница
+            connection.execute("CREATE TEMP TABLE incoming AS SELECT * FROM postings WHERE 0")
+            for page in self.fetcher.iter_pages(since, now, filters):
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO incoming VALUES (?, ?, ?, ?, ?)",
+                        ((self.client_id, posting["posting_number"], posting.get("status"),
+                          posting.get("in_process_at"), json.dumps(posting, ensure_ascii=False)) for posting in page))
+
+            with connection:
+                if mode == "full":
+                    connection.execute("DELETE FROM postings WHERE client_id = ?", (self.client_id,))
+                connection.execute("INSERT OR REPLACE INTO postings SELECT * FROM incoming")
+                connection.execute("DELETE FROM postings WHERE client_id = ? AND in_process_at < ?",
+                                   (self.client_id, since.strftime(DATE_FORMAT)))
+                full_synced_at = now if mode == "full" else state[1]
+                connection.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                                   (self.client_id, now.isoformat(), full_synced_at.isoformat(), now.isoformat()))
+        return mode
+
+    def iter_pages(self, batch_size=1000):
+        """Отдаёт отправления из снимка страницами по batch_size, не загружая весь снимок в память."""
+        since = (datetime.now(timezone.utc) - self.window).strftime(DATE_FORMAT)
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "SELECT data FROM postings WHERE client_id = ? AND status = ? AND in_process_at >= ? "
+                "ORDER BY in_process_at, posting_number",
+                (self.client_id, self.status, since))
+            while rows := cursor.fetchmany(batch_size):
+                yield [json.loads(data) for (data,) in rows]
+
+    def postings(self):
+        return [posting for page in self.iter_pages() for posting in page]
+
+    def snapshot(self, force=False):
+        """
+        Возвращает:
+            dict: Отправления в статусе status за окно window в формате ответа v3/posting/fbs/list.
+        """
+        self.sync(force=force)
+        return {"result": {"postings": self.postings(), "has_next": False}}
@@ -0,0 +1,121 @@
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from common.ParseCache import shared_cache
+from ozon_v2.StickerScan import POSTING_PATTERN, _scan_range, find_posting
+
+# Меньше этого числа страниц процессы не запускаются: их старт дороже самого разбора
+MIN_PARALLEL_PAGES = 200
+PAGES_PER_TASK = 50
+
+
+def default_workers():
+    return int(os.environ.get("STICKER_WORKERS", os.cpu_count() or 1))
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def sticker_pool(workers):
+    """
+    Общий пул процессов разбора стикеров, живёт между вызовами.
+
+    spawn, а не fork: разбор вызывается из потока многопоточного сервера Streamlit,
+    и форк может унести чужие блокировки. Старт spawn-процессов дорогой, поэтому пул
+    создаётся заново, только если изменилось число процессов.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_sticker_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def scan_stickers(stickers_pdf, pattern=POSTING_PATTERN.pattern, workers=None):
+    """
+    Извлекает номер отправления с каждой страницы PDF.
+
+    При workers > 1 и большом PDF диапазон страниц делится на куски, которые разбираются
+    в общем пуле процессов (sticker_pool); каждый процесс открывает PDF сам. Порядок результата
+    не зависит от числа процессов. Если пул не поднялся, страницы разбираются в текущем процессе.
+
+    Возвращает:
+        pd.DataFrame: Колонки posting (None, если номер не найден) и page.
+    """
+    from pypdf import PdfReader
+
+    data = stickers_pdf.read()
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    workers = default_workers() if workers is None else workers
+
+    postings = None
+    if workers > 1 and page_count >= MIN_PARALLEL_PAGES:
+        ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+        # Процессы читают PDF из временного файла: так байты не пересылаются с каждым куском страниц
+        with tempfile.TemporaryDirectory(prefix="stickers_") as directory:
+            path = os.path.join(directory, "stickers.pdf")
+            with open(path, "wb") as stream:
+                stream.write(data)
+            try:
+                chunks = sticker_pool(workers).map(_scan_range, [path] * len(ranges), [pattern] * len(ranges), ranges)
+                postings = [posting for chunk in chunks for posting in chunk]
+            except BrokenProcessPool:
+                _reset_sticker_pool()
+
+    if postings is None:
+        compiled = re.compile(pattern)
+        postings = [find_posting(page, compiled) for page in reader.pages]
+
+    return pd.DataFrame({"posting": postings, "page": range(page_count)})
+
+
+class StickerIndex:
+    """
+    Соответствие номера отправления номеру страницы в PDF со стикерами.
+
+    Строится за один проход по страницам и сохраняется в кэше по хэшу PDF,
+    поэтому повторная загрузка того же файла не извлекает текст заново.
+    """
+
+    def __init__(self, pages_df):
+        self.page_count = len(pages_df)
+        found = pages_df.dropna(subset=["posting"]).drop_duplicates(subset=["posting"], keep="first")
+        self.pages = dict(zip(found["posting"], found["page"].astype(int)))
+        self.unrecognized = pages_df.loc[pages_df["posting"].isna(), "page"].astype(int).tolist()
+
+    @classmethod
+    def load(cls, stickers_pdf, cache=None, workers=None):
+        cache = cache or shared_cache()
+        return cls(cache.cached(stickers_pdf, scan_stickers, parser_kwargs={"workers": workers},
+                                pattern=POSTING_PATTERN.pattern))
+
+    def get(self, posting):
+        return self.pages.get(posting)
+
+    def __contains__(self, posting):
+        return posting in self.pages
+
+    def __len__(self):
+        return len(self.pages)
@@ -0,0 +1,43 @@
+"""
+Поиск номера отправления на страницах PDF со стикерами.
+
+Модуль отделён от StickerIndex, чтобы процессы пула (spawn) импортировали только pypdf,
+без pandas и кэша.
+"""
+import io
+import re
+
+# Номер этикетки (до 4 цифр), затем номер отправления
+POSTING_PATTERN = re.compile(r'\d{1,4}\s+(\d{8,12}-\d{3,6}-\d{1,2})')
+
+
+def find_posting(page, pattern=POSTING_PATTERN):
+    """
+    Ищет номер отправления на странице стикера.
+
+    Сначала используется быстрый обычный режим извлечения текста, медленный layout —
+    только если в обычном номер не нашёлся.
+    """
+    for mode in ("plain", "layout"):
+        match = pattern.search(page.extract_text(extraction_mode=mode))
+        if match:
+            return match.group(1)
+    return None
+
+
+_worker_path = None
+_worker_reader = None
+
+
+def _scan_range(path, pattern, page_range):
+    # Процесс пула живёт между вызовами, PDF открывается один раз на файл, а не на каждый кусок страниц
+    global _worker_path, _worker_reader
+    if _worker_path != path:
+        from pypdf import PdfReader
+
+        with open(path, "rb") as stream:
+            _worker_reader = PdfReader(io.BytesIO(stream.read()))
+        _worker_path = path
+
+    compiled = re.compile(pattern)
+    return [find_posting(_worker_reader.pages[number], compiled) for number in range(*page_range)]
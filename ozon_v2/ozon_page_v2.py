@@ -1,6 +1,6 @@
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
-from ozon_v2.OzonAPI import OzonAPI
+from ozon_v2.PostingFetcher import OzonAPIError
 
 def main():
 
@@ -8,11 +8,20 @@ def main():
         with st.popover("Загрузите файлы здесь"):
             st.file_uploader("Стикеры", type=["pdf"], key="stickers_pdf")
             st.file_uploader("Плата", type=["xlsx"], key="plata_xlsx")
+        st.button("Обновить отправления", key="refresh_postings")
 
     if st.session_state["stickers_pdf"] and st.session_state["plata_xlsx"]:
         st.header("Файлы успешно загружены и обработаны!")
+        # pandas, pypdf и requests загружаются только когда файлы уже выбраны
+        from ozon_v2.OzonAPI import OzonAPI
+
         ozonAPI = OzonAPI(client_id=st.secrets["client_id"], key=st.secrets["key"])
-        download_pdf, download_xlsx = ozonAPI.download_df_pdf(st.session_state["plata_xlsx"], st.session_state["stickers_pdf"])
+        try:
+            download_pdf, download_xlsx = ozonAPI.download_df_pdf(st.session_state["plata_xlsx"], st.session_state["stickers_pdf"],
+                                                                  refresh=st.session_state["refresh_postings"])
+        except OzonAPIError as error:
+            st.error(str(error))
+            return
         st.subheader("Обработанный файл")
         st.download_button(
             label="Скачать файл: Стикеры",
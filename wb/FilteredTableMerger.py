@@ -1,87 +1,155 @@
 import io
+import json
 
 import pandas as pd
-from loguru import logger
+
+from common.ArticleJoin import join_articles
+from common.BackgroundLoader import StageTimer, parse_all
+from common.CompactFrame import compact_frame
+from common.EventLog import EventLog
+from common.FilterEngine import (FilterBase, FilterEngine, PercentageOrderRule, BrandRule, CategoryRule, ArticleRule,
+                                 SaveArticleRule, rule_from_dict, rule_to_dict)
+from common.XlsxColumnReader import read_columns
+
+
+def shared_jobs(sales_xlsx, markup_xlsx):
+    """Задания parse_all для файлов продаж и наценки — общих для всех акций (batch разбирает их заранее)."""
+    return {
+        "markup": (markup_xlsx, pd.read_excel, {"sheet_name": None, "header": 1}),
+        "sales": (sales_xlsx, read_columns, {"sheet_name": "Товары", "header": 1,
+                                             "usecols": ["Артикул продавца", "Заказали, шт"]}),
+    }
+
+
+def load_base(sales_xlsx, markup_xlsx, goods_exclude_xlsx, progress=None):
+    """
+    Читает и объединяет три файла в неизменяемую базу для FilteredTableMerger.
+
+    База зависит только от содержимого файлов, поэтому её можно один раз построить и раздать
+    всем сессиям, работающим с той же акцией. Файлы разбираются одновременно (parse_all).
+
+    Параметры:
+        progress (Callable[[str], None] | None): Вызывается после каждого этапа из STAGES.
+
+    Возвращает:
+        FilterBase: Компактная таблица с индексами; в meta — required_headers, сообщения загрузки
+        и время этапов загрузки.
+    """
+    progress = StageTimer(progress)
+
+    parsed = parse_all({
+        "goods_exclude": (goods_exclude_xlsx, pd.read_excel, {"sheet_name": None}),
+        **shared_jobs(sales_xlsx, markup_xlsx),
+    })
+    progress("parsed")
+
+    goods_exclude_data = parsed["goods_exclude"]
+    goods_exclude_sheet = list(goods_exclude_data.keys())[0]
+    goods_exclude_df = goods_exclude_data[goods_exclude_sheet]
+    required_headers = goods_exclude_df.columns.tolist()
+
+    markup_data = parsed["markup"]
+    markup_sheet = list(markup_data.keys())[0]
+    markup_df = markup_data[markup_sheet]
+    markup_df = markup_df.drop(columns=["Наименование"])
+
+    sales_df = parsed["sales"]
+
+    merged_df, join_report = join_articles(goods_exclude_df, 'Артикул поставщика',
+                                           [(markup_df, 'Оригинальный номер'), (sales_df, 'Артикул продавца')])
+    messages = [f"Не найдено по «{item['key']}»: {item['unmatched_rows']} строк.\n" for item in join_report]
+    progress("merged")
+
+    merged_df['Result'] = ((merged_df['Цена продажи'] -
+                            (merged_df['Среднезакупочная'] + merged_df['Комиссия без скидки'] +
+                             (merged_df['Цена продажи'] * merged_df[
+                                 'Загружаемая скидка для участия в акции'] / 100))
+                            ) / merged_df['Среднезакупочная']) * 100
+
+    # Остальные колонки наценки и продаж нужны только для Result
+    merged_df = compact_frame(merged_df, required_headers + ["Бренд", "Предмет", 'Заказали, шт', 'Result'],
+                              categorical=['Артикул поставщика', "Бренд", "Предмет"])
+
+    base = FilterBase(merged_df, article_col='Артикул поставщика', brand_col="Бренд",
+                      category_col="Предмет", orders_col='Заказали, шт',
+                      meta={"required_headers": required_headers, "messages": messages,
+                            # Тот же словарь, что у StageTimer: этап computed допишется ниже
+                            "timings": progress.timings})
+    progress("computed")
+    return base
+
 
 class FilteredTableMerger:
-    def __init__(self, sales_xlsx, markup_xlsx, goods_exclude_xlsx):
-        self.required_article = []
-        self.required_limit_order = 0
-
-        self.log_stream = io.StringIO()
-        logger.add(self.log_stream, format="{message}")
-
-        goods_exclude_data = pd.read_excel(goods_exclude_xlsx, sheet_name=None)
-        goods_exclude_sheet = list(goods_exclude_data.keys())[0]
-        goods_exclude_df = goods_exclude_data[goods_exclude_sheet]
-        self.required_headers = goods_exclude_df.columns.tolist()
-
-        markup_data = pd.read_excel(markup_xlsx, sheet_name=None, header=1)
-        markup_sheet = list(markup_data.keys())[0]
-        markup_df = markup_data[markup_sheet]
-        markup_df = markup_df.drop(columns=["Наименование"])
-
-        sales_data = pd.read_excel(sales_xlsx, sheet_name="Товары", header=1)
-        sales_columns = [col for col in list(sales_data.keys()) if col in ["Артикул продавца", "Заказали, шт"]]
-        sales_df = sales_data[sales_columns]
-
-        self.merged_df = pd.merge(goods_exclude_df, markup_df, left_on='Артикул поставщика',
-                                  right_on='Оригинальный номер', how='left')
-        self.merged_df = pd.merge(self.merged_df, sales_df, left_on='Артикул поставщика', right_on='Артикул продавца',
-                                  how='left')
-
-        self.merged_df['Result'] = ((self.merged_df['Цена продажи'] -
-                                     (self.merged_df['Среднезакупочная'] + self.merged_df['Комиссия без скидки'] +
-                                      (self.merged_df['Цена продажи'] * self.merged_df[
-                                          'Загружаемая скидка для участия в акции'] / 100))
-                                     ) / self.merged_df['Среднезакупочная']) * 100
-        
-        self.cloned_merged_df = self.merged_df.copy()
-
-        logger.info(f"Всего строк {self.merged_df.shape[0]}.\n")
+    def __init__(self, sales_xlsx, markup_xlsx, goods_exclude_xlsx, base=None):
+        self.events = EventLog()
+
+        if base is None:
+            base = load_base(sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+        self.required_headers = base.meta["required_headers"]
+        for stage, seconds in base.meta["timings"].items():
+            self.events.timing("load", stage, seconds)
+        for message in base.meta["messages"]:
+            self.events.info(message)
+
+        self.engine = FilterEngine(base, events=self.events)
+
+        self.events.info(f"Всего строк {self.engine.count}.\n")
+
+    @property
+    def merged_df(self):
+        return self.engine.frame()
+
+    @property
+    def generation(self):
+        return self.engine.generation
+
+    @property
+    def required_limit_order(self):
+        rule = self.engine.last_rule(PercentageOrderRule)
+        return rule.order_limit if rule else 0
 
     def get_brands(self):
-        return self.merged_df["Бренд"].unique()
+        return self.engine.options("brand")
 
     def get_items(self):
-        return self.merged_df["Предмет"].unique()
+        return self.engine.options("category")
 
     def get_article(self):
-        return self.merged_df["Артикул поставщика"].unique()
+        return self.engine.options("article")
 
     def remove_by_percentage_order_limit(self, percentage: int, order_limit:int):
-        check_article = ~self.merged_df['Артикул поставщика'].isin(self.required_article)
-        check_percentage = self.merged_df['Result'] > percentage
-        check_order_limit = self.merged_df['Заказали, шт'] <= order_limit
-        self.required_limit_order = order_limit
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_order_limit)]
-        logger.info(f"Вы убрали товары по проценту наценки после скидки и по количеству заказов. Осталось {self.merged_df.shape[0]} строк.\n")
-
-    # def remove_by_order_limit(self, order_limit: int):
-    #     check_article = ~self.merged_df['Артикул поставщика'].isin(self.required_article)
-    #     check_order_limit = self.merged_df['Заказали, шт'] < order_limit
-    #     self.merged_df = self.merged_df[~(check_article | check_order_limit)]
-    #     logger.info(f"Вы убрали товары по количеству заказов. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(PercentageOrderRule(percentage, order_limit))
+        self.events.info(f"Вы убрали товары по проценту наценки после скидки и по количеству заказов. Осталось {self.engine.count} строк.\n")
 
     def remove_by_brand(self, percentage: int, brand: str):
-        check_article = ~self.merged_df['Артикул поставщика'].isin(self.required_article)
-        check_percentage = self.merged_df['Result'] > percentage
-        check_order_limit = self.merged_df['Заказали, шт'] <= self.required_limit_order
-        check_brand = self.merged_df["Бренд"] == brand
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_brand & check_order_limit)]
-        logger.info(f"Вы убрали строки по бренду {brand}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(BrandRule(percentage, brand, self.required_limit_order))
+        self.events.info(f"Вы убрали строки по бренду {brand}. Осталось {self.engine.count} строк.\n")
 
     def remove_by_category(self, percentage: int, category: str):
-        check_article = ~self.merged_df['Артикул поставщика'].isin(self.required_article)
-        check_order_limit = self.merged_df['Заказали, шт'] <= self.required_limit_order
-        check_percentage = self.merged_df['Result'] > percentage
-        check_category = self.merged_df["Предмет"] == category
-        self.merged_df = self.merged_df[~(check_article & check_percentage & check_category & check_order_limit)]
-        logger.info(f"Вы убрали строки по категории {category}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(CategoryRule(percentage, category, self.required_limit_order))
+        self.events.info(f"Вы убрали строки по категории {category}. Осталось {self.engine.count} строк.\n")
+
+    def preview_percentage_order_limit(self, percentage: int, order_limit: int):
+        """
+        Предпросмотр remove_by_percentage_order_limit без изменения таблицы.
+
+        Возвращает:
+            tuple: (число строк, которые будут убраны; бренды, которые пропадут целиком)
+        """
+        return (self.engine.preview(percentage, order_limit),
+                self.engine.preview_emptied("brand", percentage, order_limit))
+
+    def preview_brand(self, percentage: int, brand: str):
+        return self.engine.preview(percentage, self.required_limit_order, "brand", brand)
+
+    def preview_category(self, percentage: int, category: str):
+        return self.engine.preview(percentage, self.required_limit_order, "category", category)
 
     def download_excel(self):
-        tmp = self.merged_df.copy()
-        tmp = tmp.filter(items=self.required_headers)
+        return self.engine.memo("excel", self._build_excel)
+
+    def _build_excel(self):
+        tmp = self.engine.frame(columns=self.required_headers)
 
         output_buffer_xlsx = io.BytesIO()
         with pd.ExcelWriter(output_buffer_xlsx, engine='xlsxwriter') as writer:
@@ -90,11 +158,10 @@ class FilteredTableMerger:
         return output_buffer_xlsx.getvalue()
     
     def download_reverse_excel(self):
-        tmp = self.merged_df.copy()
-        tmp = tmp.filter(items=self.required_headers)
+        return self.engine.memo("reverse_excel", self._build_reverse_excel)
 
-        filtered = self.cloned_merged_df[~self.cloned_merged_df['Артикул поставщика'].isin(tmp['Артикул поставщика'])]
-        filtered = filtered.filter(items=self.required_headers)
+    def _build_reverse_excel(self):
+        filtered = self.engine.reverse_frame(columns=self.required_headers)
 
         output_buffer_xlsx = io.BytesIO()
         with pd.ExcelWriter(output_buffer_xlsx, engine='xlsxwriter') as writer:
@@ -103,13 +170,43 @@ class FilteredTableMerger:
         return output_buffer_xlsx.getvalue()
 
     def get_logs(self):
-        return self.log_stream.getvalue()
+        return self.events.text()
+
+    def export_events(self):
+        return self.events.to_json()
 
     def save_article(self, article: str):
-        self.required_article.append(article.strip())
-        logger.info(f"Вы убрали из акции артикул {article}. Осталось {self.merged_df.shape[0]} строк.\n")
+        self.engine.apply(SaveArticleRule(article.strip()))
+        self.events.info(f"Вы убрали из акции артикул {article}. Осталось {self.engine.count} строк.\n")
 
     def remove_by_article(self, article: str):
-        self.merged_df = self.merged_df[self.merged_df["Артикул поставщика"] != article]
-        logger.info(f"Вы добавили в акцию артикул {article}. Осталось {self.merged_df.shape[0]} строк.\n")
-
+        self.engine.apply(ArticleRule(article))
+        self.events.info(f"Вы добавили в акцию артикул {article}. Осталось {self.engine.count} строк.\n")
+
+    def undo(self):
+        rule = self.engine.undo()
+        if rule is not None:
+            self.events.info(f"Отменено правило {rule_to_dict(rule)}. Осталось {self.engine.count} строк.\n")
+
+    def redo(self):
+        rule = self.engine.redo()
+        if rule is not None:
+            self.events.info(f"Повторено правило {rule_to_dict(rule)}. Осталось {self.engine.count} строк.\n")
+
+    def export_rules(self):
+        return json.dumps([rule_to_dict(rule) for rule in self.engine.rules()], ensure_ascii=False, indent=2)
+
+    def replay_rules(self, rules_json):
+        # Сначала разбираются все правила, чтобы ошибка в файле не оставила часть из них применённой
+        try:
+            data = json.loads(rules_json)
+            if not isinstance(data, list):
+                raise ValueError("ожидается список правил")
+            rules = [rule_from_dict(item) for item in data]
+        except ValueError as error:
+            self.events.warning(f"Правила не применены: {error}\n")
+            return
+
+        for rule in rules:
+            self.engine.apply(rule)
+        self.events.info(f"Применены сохранённые правила. Осталось {self.engine.count} строк.\n")
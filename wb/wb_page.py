@@ -1,17 +1,35 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
-from wb.FilteredTableMerger import FilteredTableMerger
+
+if TYPE_CHECKING:
+    from wb.FilteredTableMerger import FilteredTableMerger
 
 def load_files():
     required_files = ["sales_xlsx", "markup_xlsx", "goods_exclude_xlsx"]
 
     if all(st.session_state.get(key) is not None for key in required_files):
         if 'all_tables' not in st.session_state:
+            # pandas и разбор xlsx загружаются только после загрузки файлов, а не при открытии страницы
+            from common.SharedBases import loading_error, loading_progress, shared_loader
+
             sales_xlsx: UploadedFile = st.session_state["sales_xlsx"]
             markup_xlsx: UploadedFile = st.session_state["markup_xlsx"]
             goods_exclude_xlsx: UploadedFile = st.session_state["goods_exclude_xlsx"]
 
-            st.session_state['all_tables'] = FilteredTableMerger(sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+            # Файлы разбираются в фоне, страница только опрашивает этап загрузки.
+            # Разобранная таблица общая для всех сессий с теми же файлами, у сессии — только свои фильтры
+            loader = shared_loader("wb", sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+            if loader.error is not None:
+                loading_error("wb", loader, sales_xlsx, markup_xlsx, goods_exclude_xlsx)
+            elif loader.done:
+                from wb.FilteredTableMerger import FilteredTableMerger
+                st.session_state['all_tables'] = FilteredTableMerger(sales_xlsx, markup_xlsx, goods_exclude_xlsx, base=loader.result)
+            else:
+                loading_progress("wb", loader, sales_xlsx, markup_xlsx, goods_exclude_xlsx)
 
     return st.session_state.get('all_tables', None)
 
@@ -49,6 +67,52 @@ def save_article(all_tables: FilteredTableMerger):
         all_tables.save_article(selected_article)
 
 
+def undo(all_tables: FilteredTableMerger):
+    all_tables.undo()
+
+
+def redo(all_tables: FilteredTableMerger):
+    all_tables.redo()
+
+
+def replay_rules(all_tables: FilteredTableMerger):
+    if st.session_state["rules_json"] is not None:
+        all_tables.replay_rules(st.session_state["rules_json"].getvalue())
+
+
+def prepare_export(all_tables: FilteredTableMerger):
+    st.session_state["export_generation"] = all_tables.generation
+
+
+def number(key):
+    try:
+        return int(st.session_state.get(key))
+    except (TypeError, ValueError):
+        return None
+
+
+def display_preview(all_tables):
+    # Сколько строк убрали бы фильтры при текущих значениях полей; таблица не меняется
+    percentage, order_limit = number("percentage"), number("order_limit")
+    if percentage is not None and order_limit is not None:
+        rows, brands = all_tables.preview_percentage_order_limit(percentage, order_limit)
+        text = f"Будет убрано {rows} строк."
+        if len(brands):
+            text += f" Целиком уйдут бренды: {', '.join(map(str, brands[:10]))}" + (" и др." if len(brands) > 10 else "")
+        st.caption(text)
+
+
+def display_group_preview(all_tables):
+    percentage_brand, brand = number("percentage_brand"), st.session_state.get("selected_brand")
+    if percentage_brand is not None and brand is not None:
+        st.caption(f"По бренду {brand} будет убрано {all_tables.preview_brand(percentage_brand, brand)} строк.")
+
+    percentage_category, category = number("percentage_category"), st.session_state.get("selected_item")
+    if percentage_category is not None and category is not None:
+        rows = all_tables.preview_category(percentage_category, category)
+        st.caption(f"По категории {category} будет убрано {rows} строк.")
+
+
 def display_filters(all_tables):
     st.subheader("Глобальные Фильтры")
     col1, col2, col3 = st.columns([2, 2, 1])
@@ -59,6 +123,7 @@ def display_filters(all_tables):
         st.text_input("", label_visibility='collapsed', placeholder="Ограничение по заказам", key="order_limit")
     with col3:
         st.button("Применить", on_click=remove_percentage_order_limit, args=(all_tables,), key="percentage_button")
+    display_preview(all_tables)
 
 
     st.subheader("Фильтры по брендам и категориям")
@@ -81,6 +146,18 @@ def display_filters(all_tables):
         st.button("Применить", on_click=remove_brand, args=(all_tables,), key="remove_brand_button")
         st.button("Применить", on_click=remove_category, args=(all_tables,), key="remove_category_button")
         st.button("Убрать из акции", on_click=save_article, args=(all_tables,), key="save_article_button")
+    display_group_preview(all_tables)
+
+    st.subheader("История фильтров")
+    col7, col8, col9 = st.columns([1, 1, 2])
+    with col7:
+        st.button("Отменить", on_click=undo, args=(all_tables,), key="undo_button")
+        st.button("Повторить", on_click=redo, args=(all_tables,), key="redo_button")
+    with col8:
+        st.download_button("Скачать правила", data=all_tables.export_rules(), file_name="rules.json")
+    with col9:
+        st.file_uploader("Правила", type=["json"], label_visibility='collapsed', key="rules_json")
+        st.button("Применить правила", on_click=replay_rules, args=(all_tables,), key="replay_rules_button")
 
 def main():
     all_tables = None
@@ -95,22 +172,29 @@ def main():
 
         if all_tables:
             st.markdown(all_tables.get_logs())
+            with st.expander("Замеры"):
+                st.dataframe(all_tables.events.summary(), hide_index=True)
+                st.download_button("Скачать журнал", data=all_tables.export_events(), file_name="events.json")
 
     if all_tables:
         st.header("Файлы успешно загружены и обработаны!")
         display_filters(all_tables)
         st.subheader("Обработанный файл")
-        st.download_button(
-            label="Скачать файл",
-            data=all_tables.download_excel(),
-            file_name="output.xlsx",
-        )
-
-        st.download_button(
-            label="Скачать обратный файл",
-            data=all_tables.download_reverse_excel(),
-            file_name="reverse_output.xlsx",
-        )
+        st.toggle("Формировать файлы по запросу", value=True, key="lazy_export")
+        if st.session_state["lazy_export"] and st.session_state.get("export_generation") != all_tables.generation:
+            st.button("Подготовить файлы", on_click=prepare_export, args=(all_tables,), key="prepare_export_button")
+        else:
+            st.download_button(
+                label="Скачать файл",
+                data=all_tables.download_excel(),
+                file_name="output.xlsx",
+            )
+
+            st.download_button(
+                label="Скачать обратный файл",
+                data=all_tables.download_reverse_excel(),
+                file_name="reverse_output.xlsx",
+            )
     else:
         st.warning("Пожалуйста, загрузите все необходимые файлы.")
 